@@ -0,0 +1,186 @@
+"""Headless batch question answering for the Document Assistant.
+
+Runs a file of questions (regression suites, FAQ generation) through the same
+chain as the Streamlit app without one interaction per question:
+
+1. every question is embedded in one batched query-embedding call
+2. FAISS is searched once with the whole query matrix (BM25 fused per question)
+3. questions with a decisive match take the app's extractive fast path
+   (``EXTRACTIVE_FAST_PATH``); the rest are answered concurrently, at most
+   ``--concurrency`` LLM calls at a time
+
+Each answer is written to a JSONL file as soon as it completes, with its
+per-question timings; throughput is reported in questions per minute.
+
+    python Day_17_RAG_Document_Assitant/batch_qa.py questions.txt --output answers.jsonl --concurrency 8
+
+The questions file is plain text (one question per line, ``#`` comments
+allowed) or JSONL with a ``question`` field.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Shared RAG helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from embedding_cache import embed_queries as embed_query_batch
+from hybrid_retrieval import dense_search_batch, lookup_documents, reciprocal_rank_fusion
+from latency_metrics import percentile
+from rag_pipeline import EXTRACTIVE_FAST_PATH, build_qa_chain, decisive_match
+from streaming import build_stuff_prompt, stream_prompt
+
+
+def load_questions(path):
+    with open(path, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["question"] for line in lines if line]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def embed_queries(vectorstore, questions):
+    """Embed all questions in one batched call, with the query (not document) task type"""
+    embeddings = vectorstore.embedding_function
+    if hasattr(embeddings, "embed_query"):
+        return embed_query_batch(embeddings, questions)
+    return [embeddings(question) for question in questions]
+
+
+def retrieve_batch(retriever, questions, query_vectors, extractive=EXTRACTIVE_FAST_PATH):
+    """``(documents, extractive answer or None)`` for every question, from one FAISS matrix search"""
+    vectorstore = retriever.vectorstore
+    bm25 = getattr(retriever, "bm25", None)
+    k = retriever.k if bm25 is not None else retriever.search_kwargs.get("k", 4)
+    candidate_k = retriever.candidate_k if bm25 is not None else k
+
+    results = []
+    for question, query_vector, doc_ids in zip(
+            questions, query_vectors, dense_search_batch(vectorstore, query_vectors, candidate_k)):
+        # Same fast path as the interactive app, so answers and metrics match
+        match = decisive_match(vectorstore, query_vector, doc_ids) if extractive else None
+        if match is not None:
+            doc = lookup_documents(vectorstore, [match])[0]
+            results.append(([doc], doc.page_content))
+        elif bm25 is not None:
+            doc_ids = reciprocal_rank_fusion(
+                [doc_ids, bm25.search(question, candidate_k)], retriever.fused_k, retriever.rrf_k
+            )
+            results.append((retriever.select_documents(query_vector, doc_ids), None))
+        else:
+            results.append((lookup_documents(vectorstore, doc_ids), None))
+    return results
+
+
+def answer_one(qa_chain, question, docs):
+    combine_docs_chain = qa_chain.combine_documents_chain
+    start = time.perf_counter()
+    prompt = build_stuff_prompt(combine_docs_chain, docs, question=question)
+    timings = {"prompt_assembly": (time.perf_counter() - start) * 1000}
+
+    start = time.perf_counter()
+    tokens = []
+    for token in stream_prompt(combine_docs_chain.llm_chain.llm, prompt):
+        if not tokens:
+            timings["llm_first_token"] = (time.perf_counter() - start) * 1000
+        tokens.append(token)
+    timings["llm_generation"] = (time.perf_counter() - start) * 1000
+    return "".join(tokens), timings
+
+
+def run_batch(qa_chain, questions, output_path, concurrency=4):
+    """Answer ``questions`` and write one JSONL record per question; returns a summary dict"""
+    start = time.perf_counter()
+    retriever = qa_chain.retriever
+
+    embed_start = time.perf_counter()
+    query_vectors = embed_queries(retriever.vectorstore, questions)
+    embedding_ms = (time.perf_counter() - embed_start) * 1000
+
+    search_start = time.perf_counter()
+    contexts = retrieve_batch(retriever, questions, query_vectors)
+    search_ms = (time.perf_counter() - search_start) * 1000
+
+    llm_ms = []
+    failed = 0
+    fast_path = 0
+
+    def write(out, index, path, answer=None, error=None, timings=None):
+        record = {
+            "index": index,
+            "question": questions[index],
+            "path": path,
+            "sources": [doc.page_content[:80] for doc in contexts[index][0]],
+        }
+        if error is None:
+            record["answer"] = answer
+        else:
+            record["error"] = error
+        # Batch stages are shared, so each question carries its amortized share
+        record["timings"] = {
+            "query_embedding": embedding_ms / len(questions),
+            "faiss_search": search_ms / len(questions),
+            **(timings or {}),
+        }
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+
+    with open(output_path, "w", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {}
+        for index, (question, (docs, answer)) in enumerate(zip(questions, contexts)):
+            if answer is not None:
+                fast_path += 1
+                write(out, index, "extractive", answer)
+            else:
+                futures[executor.submit(answer_one, qa_chain, question, docs)] = index
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                answer, timings = future.result()
+                llm_ms.append(timings["llm_generation"])
+                write(out, index, "llm", answer, timings=timings)
+            except Exception as e:
+                failed += 1
+                write(out, index, "llm", error=str(e))
+
+    seconds = time.perf_counter() - start
+    return {
+        "questions": len(questions),
+        "failed": failed,
+        "fast_path": fast_path,
+        "seconds": seconds,
+        "questions_per_minute": len(questions) / seconds * 60 if seconds > 0 else 0.0,
+        "embedding_ms": embedding_ms,
+        "search_ms": search_ms,
+        "llm_p50_ms": percentile(llm_ms, 50) if llm_ms else None,
+        "llm_p95_ms": percentile(llm_ms, 95) if llm_ms else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer a file of questions with the Document Assistant chain")
+    parser.add_argument("questions", help="text file (one question per line) or JSONL with a 'question' field")
+    parser.add_argument("--output", default="answers.jsonl")
+    parser.add_argument("--concurrency", type=int, default=int(os.getenv("BATCH_QA_CONCURRENCY", "4")),
+                        help="maximum concurrent LLM calls")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    if not questions:
+        parser.error(f"no questions found in {args.questions}")
+
+    summary = run_batch(build_qa_chain(), questions, args.output, args.concurrency)
+    print(f"Answered {summary['questions'] - summary['failed']}/{summary['questions']} questions "
+          f"in {summary['seconds']:.1f}s ({summary['questions_per_minute']:.1f} questions/min) -> {args.output}")
+    print(f"  embedding {summary['embedding_ms']:.0f} ms, search {summary['search_ms']:.0f} ms (whole batch), "
+          f"{summary['fast_path']} answered by the extractive fast path")
+    if summary["llm_p50_ms"] is not None:
+        print(f"  LLM p50 {summary['llm_p50_ms']:.0f} ms, p95 {summary['llm_p95_ms']:.0f} ms "
+              f"at concurrency {args.concurrency}")
+
+
+if __name__ == "__main__":
+    main()
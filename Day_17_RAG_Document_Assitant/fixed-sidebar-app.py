@@ -1,10 +1,13 @@
-import os, getpass
+import os, getpass, sys, threading
 import streamlit as st
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.vectorstores import FAISS
-from langchain.chains import RetrievalQA
-import time
+
+# Shared RAG helpers live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency_metrics import LatencyTracker, StageTimer
+from prefetch import FollowUpPrefetcher, create_prefetch_pool
+from rag_client import RAG_API_URL, RAGClient
+from rag_pipeline import build_qa_chain, stream_answer_with_timings
+from single_flight import SingleFlight, normalize_query
 
 # Set page configuration
 st.set_page_config(
@@ -99,52 +102,71 @@ if 'initialized' not in st.session_state:
     _set_env("GOOGLE_API_KEY")
     st.session_state.initialized = True
 
-# Define sample documents
-documents = [
-    "LangChain is a framework for building AI applications using large language models (LLMs). It offers modular tools for prompt management, chaining, and agent-based workflows, streamlining the integration of complex AI tasks.",
-    "Retrieval-Augmented Generation (RAG) enhances generative models by combining them with document retrieval methods. This hybrid approach leverages external knowledge bases to provide more contextually accurate and informed responses.",
-    "FAISS, developed by Facebook, is a library designed for efficient similarity search in dense vector spaces. It plays a crucial role in rapidly retrieving relevant documents from large corpora in RAG systems.",
-    "Streamlit is a Python library that enables developers to build interactive, data-driven web applications with minimal code. It is ideal for quickly prototyping and deploying machine learning and AI-powered dashboards.",
-    "Generative AI (GenAI) involves algorithms that can create new content—such as text, images, or music—by learning from vast datasets. It is transforming creative fields and automating content generation.",
-    "Large Language Models (LLMs) are neural networks trained on extensive text datasets, capable of understanding, generating, and summarizing human language with impressive accuracy.",
-    "Agentic AI refers to systems that operate autonomously by making decisions based on predefined objectives and learned behaviors, pushing the boundaries of automated problem solving.",
-    "Prompt Engineering is the process of designing effective input prompts to guide language models. By refining prompts, developers can control the output quality and relevance of generated content.",
-    "Chain-of-Thought prompting encourages language models to reason through tasks step-by-step, resulting in more coherent and logically structured outputs, which is vital for complex problem-solving.",
-    "Reinforcement Learning from Human Feedback (RLHF) is a training paradigm where models learn from human evaluations, aligning AI behavior with human values and expectations.",
-    "Few-shot and Zero-shot Learning enable models to perform tasks with little to no task-specific data, demonstrating the flexibility of modern LLMs in adapting to new challenges.",
-    "Fine-tuning pre-trained models on domain-specific data can significantly improve performance on specialized tasks, bridging the gap between general-purpose and targeted applications.",
-    "Neural Search leverages deep learning to understand semantic relationships in text, enhancing traditional keyword-based search methods for improved relevance in document retrieval.",
-    "AI Safety and Alignment research focuses on ensuring that AI systems are both reliable and ethical, addressing potential risks and aligning AI decisions with human intentions.",
-    "Transformers, the architecture underpinning most state-of-the-art LLMs, utilize self-attention mechanisms to process sequences in parallel, facilitating efficient and scalable model training.",
-    "Memory-augmented Neural Networks incorporate external memory components to maintain context over longer sequences, thereby improving the consistency and coherence of generated outputs.",
-    "Multimodal AI systems integrate text, images, and other data types to produce richer, more context-aware responses, broadening the scope of traditional language models.",
-    "Ethical AI development emphasizes transparency, fairness, and accountability, ensuring that AI systems are developed and deployed in ways that benefit society while mitigating bias.",
-    "Scalable AI infrastructure involves the use of distributed computing and optimized algorithms, which is essential for processing large-scale data and supporting enterprise-level AI applications.",
-    "Explainable AI (XAI) techniques aim to make the decision-making processes of complex models more transparent, helping stakeholders understand and trust AI-driven insights."
-]
-
 # Initialize the RAG components
 @st.cache_resource
 def initialize_rag():
-    embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-    faiss_store = FAISS.from_texts(documents, embeddings)
-    retriever = faiss_store.as_retriever()
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro-latest",
-        temperature=0.3,
-        max_tokens=800
-    )
-    qa_chain = RetrievalQA.from_chain_type(
-        llm=llm, 
-        chain_type="stuff",
-        retriever=retriever,
-    )
-    return qa_chain
-
-# Function to get answer
-def get_answer(query, qa_chain):
-    response = qa_chain.run(query)
-    return response
+    return build_qa_chain()
+
+# Thin-client mode: with RAG_API_URL set, answers come from the RAG API (rag_api.py)
+@st.cache_resource
+def get_api_client():
+    return RAGClient(RAG_API_URL)
+
+def pipeline_tokens(query, qa_chain, timer, on_stage=None):
+    if RAG_API_URL:
+        return get_api_client().stream_answer(query)
+    return stream_answer_with_timings(query, qa_chain, timer, on_stage)
+
+# Rolling per-stage latency stats shared by all sessions, also logged to JSONL
+@st.cache_resource
+def get_latency_tracker():
+    return LatencyTracker()
+
+# Identical questions in flight across sessions share one LLM call; results are kept briefly
+@st.cache_resource
+def get_answer_flights():
+    return SingleFlight(ttl_seconds=int(os.getenv("ANSWER_COALESCE_TTL", "60")))
+
+# Function to stream the answer token by token, timing each pipeline stage
+def stream_answer(query, qa_chain, on_stage=None):
+    owner = threading.get_ident()
+    
+    def report(label, fraction):
+        # A coalesced stream can be finished by another session's thread
+        if on_stage is not None and threading.get_ident() == owner:
+            on_stage(label, fraction)
+    
+    def produce():
+        timer = StageTimer()
+        yield from pipeline_tokens(query, qa_chain, timer, report)
+        timings = {**timer.timings, "total": timer.total()}
+        if timer.timings:
+            # Totals per path show how often the extractive fast path fires and what it saves
+            path = "llm_path_total" if "llm_generation" in timer.timings else "fast_path_total"
+            timings[path] = timings["total"]
+        get_latency_tracker().record(timings, query=query)
+    
+    yield from get_answer_flights().stream(normalize_query(query), produce)
+    if on_stage is not None:
+        on_stage("Done", 1.0)
+
+# Bounded pool shared by all sessions for speculative follow-up answers
+@st.cache_resource
+def get_prefetch_pool():
+    return create_prefetch_pool()
+
+def get_prefetcher():
+    if 'prefetcher' not in st.session_state:
+        st.session_state.prefetcher = FollowUpPrefetcher(get_prefetch_pool())
+    return st.session_state.prefetcher
+
+# Speculative answers skip the latency log so it reflects what users waited for
+def speculative_answer(question, qa_chain):
+    return pipeline_tokens(question, qa_chain, StageTimer())
+
+def select_follow_up(follow_up):
+    st.session_state.query = follow_up
+    st.session_state.selected_follow_up = follow_up
 
 # Sidebar with app information - Using native Streamlit components instead of HTML
 with st.sidebar:
@@ -197,26 +219,36 @@ with col2:
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Initialize the RAG system
-qa_chain = initialize_rag()
+qa_chain = None if RAG_API_URL else initialize_rag()
 
 # Process query
-if search_button or (query and st.session_state.get('query') != query):
+selected_follow_up = st.session_state.pop('selected_follow_up', None)
+if search_button or selected_follow_up or (query and st.session_state.get('query') != query):
     st.session_state.query = query
     if query:
+        prefetcher = get_prefetcher()
+        # A clicked follow-up may already be answered; anything else still in flight is stale
+        prefetched = prefetcher.take(query) if selected_follow_up == query else None
+        prefetcher.cancel()
         with st.spinner("Searching knowledge base..."):
-            # Add a slight delay and animation for better UX
-            progress_bar = st.progress(0)
-            for i in range(100):
-                time.sleep(0.01)
-                progress_bar.progress(i + 1)
-            
-            answer = get_answer(query, qa_chain)
-            
-            # Display the result in a card
-            st.markdown("<div class='result-card'>", unsafe_allow_html=True)
-            st.markdown("### 💡 Answer")
-            st.markdown(answer)
-            st.markdown("</div>", unsafe_allow_html=True)
+            # Display the result in a card, rendering tokens as they arrive
+            if prefetched is not None:
+                st.markdown("<div class='result-card'>", unsafe_allow_html=True)
+                st.markdown("### 💡 Answer")
+                st.markdown(prefetched)
+                st.caption("⚡ Prepared in the background while you were reading")
+                st.markdown("</div>", unsafe_allow_html=True)
+            else:
+                # Progress follows the real pipeline stages
+                progress_bar = st.progress(0.0, text="Starting...")
+                
+                def on_stage(label, fraction):
+                    progress_bar.progress(fraction, text=label)
+                
+                st.markdown("<div class='result-card'>", unsafe_allow_html=True)
+                st.markdown("### 💡 Answer")
+                answer = st.write_stream(stream_answer(query, qa_chain, on_stage))
+                st.markdown("</div>", unsafe_allow_html=True)
             
             # Show a success message
             st.success("Response generated successfully!")
@@ -232,9 +264,46 @@ if search_button or (query and st.session_state.get('query') != query):
                 f"What are the limitations of {query.split()[0:3]}?"
             ]
             
+            # Answer them in the background while the user reads
+            prefetcher.start(follow_ups, lambda question: speculative_answer(question, qa_chain))
+            
             cols = st.columns(3)
             for i, follow_up in enumerate(follow_ups):
                 with cols[i]:
-                    if st.button(follow_up, key=f"follow_{i}"):
-                        st.session_state.query = follow_up
-                        st.experimental_rerun()
+                    st.button(follow_up, key=f"follow_{i}", on_click=select_follow_up, args=(follow_up,))
+
+# Latency panel (rendered last so it includes this request)
+with st.sidebar:
+    st.subheader("⏱️ Latency (ms)")
+    latency_summary = get_latency_tracker().summary()
+    if latency_summary:
+        st.table([
+            {"stage": stage, "p50": f"{stats['p50']:.0f}", "p95": f"{stats['p95']:.0f}", "n": stats["count"]}
+            for stage, stats in latency_summary.items()
+        ])
+    else:
+        st.caption("No requests yet.")
+    
+    fast_path = latency_summary.get("fast_path_total")
+    if fast_path:
+        answered = fast_path["count"] + latency_summary.get("llm_path_total", {}).get("count", 0)
+        llm_p50 = latency_summary.get("llm_path_total", {}).get("p50")
+        st.caption(
+            f"Extractive fast path: {fast_path['count']} of {answered} answers, "
+            f"p50 {fast_path['p50']:.0f} ms"
+            + (f" vs {llm_p50:.0f} ms via the LLM" if llm_p50 is not None else "")
+        )
+    
+    flight_stats = get_answer_flights().stats()
+    if flight_stats["calls"]:
+        st.caption(
+            f"Answer calls: {flight_stats['calls']} run, {flight_stats['coalesced']} coalesced, "
+            f"{flight_stats['cache_hits']} served from the short-term cache"
+        )
+    
+    prefetch_stats = get_prefetcher().stats()
+    if prefetch_stats["started"]:
+        st.caption(
+            f"Follow-up prefetch: {prefetch_stats['used']} used, "
+            f"{prefetch_stats['wasted']} wasted of {prefetch_stats['started']} started"
+        )
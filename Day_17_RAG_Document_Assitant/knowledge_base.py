@@ -0,0 +1,115 @@
+"""Static knowledge base for the Document Assistant and its embedding artifact.
+
+The corpus never changes at runtime, so it is embedded once by a build step and
+written as a versioned artifact:
+
+    kb_artifact/vectors.npy     float32 matrix, one row per document
+    kb_artifact/documents.json  texts and metadata in the same order
+    kb_artifact/manifest.json   hash of corpus + embedding model, shape, build time
+
+Server start-up loads the artifact and builds the FAISS index locally, with no
+network embedding calls, and only re-embeds when the corpus or model hash no
+longer matches. Build ahead of deployment with:
+
+    python Day_17_RAG_Document_Assitant/knowledge_base.py
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+from langchain.vectorstores import FAISS
+
+EMBEDDING_MODEL = "models/embedding-001"
+ARTIFACT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kb_artifact")
+
+# Sample documents that make up the knowledge base
+documents = [
+    "LangChain is a framework for building AI applications using large language models (LLMs). It offers modular tools for prompt management, chaining, and agent-based workflows, streamlining the integration of complex AI tasks.",
+    "Retrieval-Augmented Generation (RAG) enhances generative models by combining them with document retrieval methods. This hybrid approach leverages external knowledge bases to provide more contextually accurate and informed responses.",
+    "FAISS, developed by Facebook, is a library designed for efficient similarity search in dense vector spaces. It plays a crucial role in rapidly retrieving relevant documents from large corpora in RAG systems.",
+    "Streamlit is a Python library that enables developers to build interactive, data-driven web applications with minimal code. It is ideal for quickly prototyping and deploying machine learning and AI-powered dashboards.",
+    "Generative AI (GenAI) involves algorithms that can create new content—such as text, images, or music—by learning from vast datasets. It is transforming creative fields and automating content generation.",
+    "Large Language Models (LLMs) are neural networks trained on extensive text datasets, capable of understanding, generating, and summarizing human language with impressive accuracy.",
+    "Agentic AI refers to systems that operate autonomously by making decisions based on predefined objectives and learned behaviors, pushing the boundaries of automated problem solving.",
+    "Prompt Engineering is the process of designing effective input prompts to guide language models. By refining prompts, developers can control the output quality and relevance of generated content.",
+    "Chain-of-Thought prompting encourages language models to reason through tasks step-by-step, resulting in more coherent and logically structured outputs, which is vital for complex problem-solving.",
+    "Reinforcement Learning from Human Feedback (RLHF) is a training paradigm where models learn from human evaluations, aligning AI behavior with human values and expectations.",
+    "Few-shot and Zero-shot Learning enable models to perform tasks with little to no task-specific data, demonstrating the flexibility of modern LLMs in adapting to new challenges.",
+    "Fine-tuning pre-trained models on domain-specific data can significantly improve performance on specialized tasks, bridging the gap between general-purpose and targeted applications.",
+    "Neural Search leverages deep learning to understand semantic relationships in text, enhancing traditional keyword-based search methods for improved relevance in document retrieval.",
+    "AI Safety and Alignment research focuses on ensuring that AI systems are both reliable and ethical, addressing potential risks and aligning AI decisions with human intentions.",
+    "Transformers, the architecture underpinning most state-of-the-art LLMs, utilize self-attention mechanisms to process sequences in parallel, facilitating efficient and scalable model training.",
+    "Memory-augmented Neural Networks incorporate external memory components to maintain context over longer sequences, thereby improving the consistency and coherence of generated outputs.",
+    "Multimodal AI systems integrate text, images, and other data types to produce richer, more context-aware responses, broadening the scope of traditional language models.",
+    "Ethical AI development emphasizes transparency, fairness, and accountability, ensuring that AI systems are developed and deployed in ways that benefit society while mitigating bias.",
+    "Scalable AI infrastructure involves the use of distributed computing and optimized algorithms, which is essential for processing large-scale data and supporting enterprise-level AI applications.",
+    "Explainable AI (XAI) techniques aim to make the decision-making processes of complex models more transparent, helping stakeholders understand and trust AI-driven insights."
+]
+
+
+def corpus_hash(texts, model_name):
+    """Version of the artifact: changes whenever a document or the model changes"""
+    digest = hashlib.sha256(model_name.encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def build_artifact(embeddings, texts=documents, model_name=EMBEDDING_MODEL, artifact_dir=ARTIFACT_DIR):
+    """Embed the corpus and write vectors, texts and manifest to ``artifact_dir``"""
+    vectors = np.asarray(embeddings.embed_documents(list(texts)), dtype=np.float32)
+    os.makedirs(artifact_dir, exist_ok=True)
+    np.save(os.path.join(artifact_dir, "vectors.npy"), vectors)
+    with open(os.path.join(artifact_dir, "documents.json"), "w", encoding="utf-8") as f:
+        json.dump({"texts": list(texts), "metadatas": [{"doc_id": i} for i in range(len(texts))]}, f)
+    # Written last, so a half-finished build never looks current
+    manifest = {
+        "corpus_hash": corpus_hash(texts, model_name),
+        "model": model_name,
+        "count": int(vectors.shape[0]),
+        "dim": int(vectors.shape[1]),
+        "built_at": time.time(),
+    }
+    with open(os.path.join(artifact_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def load_artifact(texts=documents, model_name=EMBEDDING_MODEL, artifact_dir=ARTIFACT_DIR):
+    """Return (vectors, texts, metadatas) if the artifact matches the corpus, else None"""
+    try:
+        with open(os.path.join(artifact_dir, "manifest.json"), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return None
+    if manifest.get("corpus_hash") != corpus_hash(texts, model_name):
+        return None
+    vectors = np.load(os.path.join(artifact_dir, "vectors.npy"))
+    with open(os.path.join(artifact_dir, "documents.json"), encoding="utf-8") as f:
+        stored = json.load(f)
+    return vectors, stored["texts"], stored["metadatas"]
+
+
+def load_or_build_store(embeddings, texts=documents, model_name=EMBEDDING_MODEL, artifact_dir=ARTIFACT_DIR):
+    """FAISS store for the corpus, embedding it only if the artifact is missing or stale"""
+    artifact = load_artifact(texts, model_name, artifact_dir)
+    if artifact is None:
+        build_artifact(embeddings, texts, model_name, artifact_dir)
+        artifact = load_artifact(texts, model_name, artifact_dir)
+    vectors, stored_texts, metadatas = artifact
+    return FAISS.from_embeddings(
+        list(zip(stored_texts, vectors.tolist())), embeddings, metadatas=metadatas
+    )
+
+
+if __name__ == "__main__":
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    if load_artifact() is not None:
+        print(f"Artifact in {ARTIFACT_DIR} is up to date.")
+    else:
+        manifest = build_artifact(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL))
+        print(f"Embedded {manifest['count']} documents ({manifest['dim']} dims) into {ARTIFACT_DIR}")
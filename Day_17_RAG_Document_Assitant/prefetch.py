@@ -0,0 +1,91 @@
+"""Speculative answers for the Document Assistant's follow-up suggestions.
+
+While the user reads an answer, the suggested follow-up questions are answered
+in the background on a bounded, process-wide thread pool. Each Streamlit
+session owns a ``FollowUpPrefetcher`` that keeps the results, so clicking a
+suggestion renders the stored answer instead of a fresh retrieval + LLM round
+trip. A new query cancels the outstanding work: queued jobs never start and
+running ones stop at the next streamed token. Clicking a suggestion whose job
+has not started yet answers it directly; one that is running is waited on for
+at most ``PREFETCH_WAIT_SECONDS``.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "3"))
+PREFETCH_WAIT_SECONDS = float(os.getenv("PREFETCH_WAIT_SECONDS", "10"))
+
+
+def create_prefetch_pool(max_workers=PREFETCH_WORKERS):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="follow-up-prefetch")
+
+
+class FollowUpPrefetcher:
+    """Per-session cache of speculative follow-up answers"""
+
+    def __init__(self, executor):
+        self.executor = executor
+        self._futures = {}
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.wasted = 0
+
+    def start(self, questions, answer_tokens):
+        """Answer ``questions`` in the background; ``answer_tokens(q)`` yields answer tokens"""
+        self.cancel()
+        cancelled = self._cancelled = threading.Event()
+        with self._lock:
+            for question in questions:
+                if question not in self._futures:
+                    self._futures[question] = self.executor.submit(
+                        self._run, answer_tokens, question, cancelled
+                    )
+                    self.started += 1
+
+    @staticmethod
+    def _run(answer_tokens, question, cancelled):
+        tokens = []
+        for token in answer_tokens(question):
+            if cancelled.is_set():
+                return None
+            tokens.append(token)
+        return "".join(tokens)
+
+    def take(self, question, timeout=PREFETCH_WAIT_SECONDS):
+        """Return the prefetched answer for ``question``, waiting up to ``timeout`` if it is running.
+
+        Returns None if the question was not prefetched, its job had not
+        started yet, failed or did not finish in time.
+        """
+        with self._lock:
+            future = self._futures.pop(question, None)
+        if future is None:
+            return None
+        if future.cancel():
+            # Still queued behind other prefetches: answering directly is faster
+            self.wasted += 1
+            return None
+        try:
+            answer = future.result(timeout=timeout)
+        except Exception:
+            # Failed or timed out; the caller answers it the normal way
+            self.wasted += 1
+            return None
+        if answer is not None:
+            self.used += 1
+        return answer
+
+    def cancel(self):
+        """Drop every outstanding prefetch; each one counts as wasted"""
+        self._cancelled.set()
+        with self._lock:
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.cancel()
+        self.wasted += len(futures)
+
+    def stats(self):
+        return {"started": self.started, "used": self.used, "wasted": self.wasted}
@@ -0,0 +1,177 @@
+"""Instrumented retrieval + generation pipeline for the Document Assistant.
+
+``build_qa_chain`` builds the ``RetrievalQA`` "stuff" chain shared by the
+Streamlit app and the headless entry points. ``stream_answer_with_timings``
+runs the same steps as that chain but as explicit, individually timed stages,
+so the UI can show real progress and the latency panel can show where the time
+goes. With ``EXTRACTIVE_FAST_PATH=1``, when retrieval is decisive (the top hit
+is very similar to the query and well ahead of the runner-up) the matched
+document is returned as an extractive answer and the LLM call is skipped.
+"""
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from langchain.chains import RetrievalQA
+from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+
+from async_embeddings import AsyncBatchEmbeddings
+from context_selection import CONTEXT_TOKEN_BUDGET, MMR_LAMBDA, stored_vectors
+from embedding_cache import embedding_model_name
+from hybrid_retrieval import (
+    BM25Index, HybridRetriever, dense_search, embed_query_fn, lookup_documents, reciprocal_rank_fusion,
+)
+from knowledge_base import ARTIFACT_DIR, EMBEDDING_MODEL, load_or_build_store
+from local_embeddings import select_embeddings
+from streaming import astream_prompt, build_stuff_prompt, stream_prompt
+
+# Extractive fast path thresholds, in cosine similarity of query and document embeddings.
+# Off by default: the thresholds are not calibrated for any embedding backend, and
+# a question on the right topic but asking something else (limitations rather
+# than a description) can still clear them and get the raw passage back
+EXTRACTIVE_FAST_PATH = os.getenv("EXTRACTIVE_FAST_PATH", "0") == "1"
+EXTRACTIVE_MIN_SIMILARITY = float(os.getenv("EXTRACTIVE_MIN_SIMILARITY", "0.85"))
+EXTRACTIVE_MIN_MARGIN = float(os.getenv("EXTRACTIVE_MIN_MARGIN", "0.1"))
+
+STAGES = [
+    ("query_embedding", "Embedding query..."),
+    ("faiss_search", "Searching knowledge base..."),
+    ("prompt_assembly", "Assembling prompt..."),
+    ("llm_generation", "Generating answer..."),
+]
+
+
+def build_qa_chain(embeddings=None, llm=None, artifact_dir=ARTIFACT_DIR):
+    """RetrievalQA "stuff" chain over the knowledge base with hybrid retrieval"""
+    # Concurrent, rate-limited batches with per-batch retry, unless
+    # EMBEDDING_BACKEND selects a local CPU backend
+    if embeddings is None:
+        embeddings = select_embeddings(
+            lambda: AsyncBatchEmbeddings(GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL))
+        )
+    # Load the prebuilt embedding artifact; re-embed only if the corpus or model changed
+    faiss_store = load_or_build_store(
+        embeddings, model_name=embedding_model_name(embeddings), artifact_dir=artifact_dir
+    )
+    # Hybrid retrieval: FAISS similarity fused with BM25 keyword matches
+    bm25_index = BM25Index()
+    bm25_index.add_vectorstore(faiss_store)
+    retriever = HybridRetriever(
+        vectorstore=faiss_store, bm25=bm25_index, k=4,
+        mmr_lambda=MMR_LAMBDA, token_budget=CONTEXT_TOKEN_BUDGET,
+    )
+    if llm is None:
+        llm = ChatGoogleGenerativeAI(
+            model="gemini-1.5-pro-latest",
+            temperature=0.3,
+            max_tokens=800
+        )
+    return RetrievalQA.from_chain_type(
+        llm=llm,
+        chain_type="stuff",
+        retriever=retriever,
+    )
+
+
+def decisive_match(vectorstore, query_vector, doc_ids, min_similarity=EXTRACTIVE_MIN_SIMILARITY,
+                   min_margin=EXTRACTIVE_MIN_MARGIN):
+    """Docstore id of the best of the top two hits if it clears both thresholds, else None"""
+    if not doc_ids:
+        return None
+    vectors = stored_vectors(vectorstore, doc_ids[:2])
+    query = np.asarray(query_vector, dtype=np.float32)
+    similarities = vectors @ query / np.maximum(np.linalg.norm(vectors, axis=1) * np.linalg.norm(query), 1e-12)
+    best = int(np.argmax(similarities))
+    runner_up = similarities[1 - best] if len(similarities) > 1 else -1.0
+    if similarities[best] >= min_similarity and similarities[best] - runner_up >= min_margin:
+        return doc_ids[best]
+    return None
+
+
+def prepare_prompt_with_timings(query, qa_chain, timer, on_stage=None, extractive=EXTRACTIVE_FAST_PATH):
+    """Embed, retrieve and assemble the answer prompt for ``query``, timing each stage.
+
+    Returns ``(prompt, None)``, or ``(None, answer)`` when the extractive fast
+    path answers directly from the matched document.
+    """
+    def enter(index):
+        if on_stage is not None:
+            on_stage(STAGES[index][1], index / len(STAGES))
+
+    retriever = qa_chain.retriever
+    vectorstore = retriever.vectorstore
+    bm25 = getattr(retriever, "bm25", None)
+    k = retriever.k if bm25 is not None else retriever.search_kwargs.get("k", 4)
+    candidate_k = retriever.candidate_k if bm25 is not None else k
+
+    enter(0)
+    with timer.stage("query_embedding"):
+        query_vector = embed_query_fn(vectorstore)(query)
+
+    enter(1)
+    with timer.stage("faiss_search"):
+        doc_ids = dense_search(vectorstore, query_vector, candidate_k)
+    if extractive:
+        with timer.stage("extractive_check"):
+            match = decisive_match(vectorstore, query_vector, doc_ids)
+        if match is not None:
+            return None, lookup_documents(vectorstore, [match])[0].page_content
+    if bm25 is not None:
+        # Keyword ranking fused with the vector ranking (hybrid retrieval)
+        with timer.stage("bm25_search"):
+            keyword_ids = bm25.search(query, candidate_k)
+            doc_ids = reciprocal_rank_fusion([doc_ids, keyword_ids], retriever.fused_k, retriever.rrf_k)
+        # MMR and the token budget trim redundant chunks before they reach the prompt
+        with timer.stage("context_selection"):
+            docs = retriever.select_documents(query_vector, doc_ids)
+    else:
+        docs = lookup_documents(vectorstore, doc_ids)
+
+    enter(2)
+    with timer.stage("prompt_assembly"):
+        prompt = build_stuff_prompt(qa_chain.combine_documents_chain, docs, question=query)
+
+    enter(3)
+    return prompt, None
+
+
+def stream_answer_with_timings(query, qa_chain, timer, on_stage=None):
+    """Yield answer tokens for ``query`` while recording stage timings on ``timer``.
+
+    ``on_stage(label, fraction)`` is called as each stage starts and with
+    ``fraction=1.0`` once the answer is complete.
+    """
+    prompt, answer = prepare_prompt_with_timings(query, qa_chain, timer, on_stage)
+    if answer is not None:
+        yield answer
+        if on_stage is not None:
+            on_stage("Done", 1.0)
+        return
+
+    start = time.perf_counter()
+    for token in stream_prompt(qa_chain.combine_documents_chain.llm_chain.llm, prompt):
+        if "llm_first_token" not in timer.timings:
+            timer.add("llm_first_token", (time.perf_counter() - start) * 1000)
+        yield token
+    timer.add("llm_generation", (time.perf_counter() - start) * 1000)
+
+    if on_stage is not None:
+        on_stage("Done", 1.0)
+
+
+async def astream_answer_with_timings(query, qa_chain, timer):
+    """Async ``stream_answer_with_timings``: retrieval runs on a worker thread and
+    the LLM is streamed natively, so an event loop can serve many answers at once"""
+    prompt, answer = await asyncio.to_thread(prepare_prompt_with_timings, query, qa_chain, timer)
+    if answer is not None:
+        yield answer
+        return
+
+    start = time.perf_counter()
+    async for token in astream_prompt(qa_chain.combine_documents_chain.llm_chain.llm, prompt):
+        if "llm_first_token" not in timer.timings:
+            timer.add("llm_first_token", (time.perf_counter() - start) * 1000)
+        yield token
+    timer.add("llm_generation", (time.perf_counter() - start) * 1000)
@@ -0,0 +1,218 @@
+"""Memory-efficient dataset loading for the Data Analysis Agent.
+
+CSV files are read in chunks and each chunk is shrunk before the next one is
+read, so peak memory stays close to the final frame instead of the naive
+all-object load:
+
+- integer columns become int32 when their values fit in int16, so ordinary
+  arithmetic keeps 16 bits of headroom (never unsigned, where ``age - 30``
+  would wrap around); the frame handed to generated code gets int64
+  (``plain_frame``)
+- float columns stay float64: float32 keeps each value within 1e-4 but sums
+  over many rows drift (hundreds on a 2M-row total), which the agent's exact
+  answers cannot afford
+- low-cardinality text columns (store, payment method, weather...) become
+  categoricals, merged across chunks with ``union_categoricals``; generated
+  code gets them back as plain text, since a categorical ``groupby`` also
+  returns every unobserved category (as 0) and warns about ``observed``
+- date columns are detected and their format inferred once, on the first
+  chunk, then parsed with that fixed format; a column is only converted if
+  every non-null value in every chunk parses, otherwise it stays text (the
+  file is re-read if a later chunk disagrees with earlier ones)
+
+Parquet and Feather files are read column-typed through pyarrow and get the
+same optimization; Excel files are read whole and optimized afterwards.
+"""
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.1
+    from pandas.core.tools.datetimes import guess_datetime_format
+
+CHUNK_ROWS = int(os.getenv("LOADER_CHUNK_ROWS", "200000"))
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+# Integers are stored as int32 only below this magnitude (int16 range)
+INT32_MAX_VALUE = 2 ** 15
+DATE_SAMPLE_SIZE = 200
+
+SUPPORTED_TYPES = ["csv", "xlsx", "parquet", "feather"]
+
+
+def _is_text(series):
+    return series.dtype == object or pd.api.types.is_string_dtype(series.dtype)
+
+
+def parse_dates(series, date_format):
+    """``series`` parsed with ``date_format``, or None if any non-null value does not parse"""
+    parsed = pd.to_datetime(series, format=date_format, errors="coerce")
+    return parsed if parsed.notna().sum() == series.notna().sum() else None
+
+
+def detect_date_formats(frame):
+    """Map text columns that look like dates to their inferred strptime format.
+
+    Only a sample is checked here; ``optimize_frame`` converts a column only if
+    all of its values parse.
+    """
+    formats = {}
+    for column in frame.columns:
+        series = frame[column]
+        if not _is_text(series):
+            continue
+        sample = series.dropna().astype(str).head(DATE_SAMPLE_SIZE)
+        if sample.empty:
+            continue
+        date_format = guess_datetime_format(sample.iloc[0])
+        if date_format is not None and parse_dates(sample, date_format) is not None:
+            formats[column] = date_format
+    return formats
+
+
+def unparsed_dates(frame, date_formats):
+    """Columns of ``date_formats`` that ``optimize_frame`` had to leave as text"""
+    return [column for column in date_formats if not pd.api.types.is_datetime64_any_dtype(frame[column])]
+
+
+def _downcast_int(series):
+    if pd.api.types.is_unsigned_integer_dtype(series) and len(series) and series.max() > np.iinfo(np.int64).max:
+        return series
+    small = len(series) and series.abs().max() < INT32_MAX_VALUE
+    return series.astype(np.int32 if small else np.int64)
+
+
+def optimize_frame(frame, date_formats=None):
+    """Downcast numbers, parse dates and categorize low-cardinality text, column by column"""
+    date_formats = date_formats or {}
+    for column in frame.columns:
+        series = frame[column]
+        parsed = parse_dates(series, date_formats[column]) if column in date_formats else None
+        if parsed is not None:
+            frame[column] = parsed
+        elif pd.api.types.is_bool_dtype(series):
+            continue
+        elif pd.api.types.is_integer_dtype(series):
+            frame[column] = _downcast_int(series)
+        elif _is_text(series) and len(series):
+            if series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * len(series):
+                frame[column] = series.astype("category")
+    return frame
+
+
+def _combine(chunks):
+    """Concatenate optimized chunks, keeping columns categorical when every chunk is"""
+    if len(chunks) == 1:
+        return chunks[0]
+    combined = {}
+    for column in chunks[0].columns:
+        parts = [chunk[column] for chunk in chunks]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            combined[column] = pd.Series(union_categoricals(parts, ignore_order=True), name=column)
+        else:
+            combined[column] = pd.concat(
+                [part.astype(object) if isinstance(part.dtype, pd.CategoricalDtype) else part for part in parts],
+                ignore_index=True,
+            )
+    return pd.DataFrame(combined)
+
+
+def plain_frame(df):
+    """``df`` with the dtypes of a plain pandas load, for generated plot code and query plans.
+
+    That code is written against ordinary pandas: int64 arithmetic must not
+    overflow where the compact int32 storage would, float columns from other
+    sources (float32 Parquet) are aggregated as float64, and grouping by a
+    text column only returns the values present after filtering.
+    """
+    df = df.copy(deep=False)
+    for column in df.columns:
+        series = df[column]
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series) \
+                and series.dtype != np.uint64:
+            df[column] = series.astype(np.int64)
+        elif pd.api.types.is_float_dtype(series):
+            df[column] = series.astype(np.float64)
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            df[column] = series.astype(object)
+    return df
+
+
+def _memory(frame):
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def _read_csv(file, chunk_rows):
+    """Read and optimize a CSV chunk by chunk; returns (chunks, naive bytes, date formats)"""
+    date_formats = None
+    while True:
+        chunks, naive_bytes, restart = [], 0, False
+        with pd.read_csv(file, chunksize=chunk_rows) as reader:
+            for chunk in reader:
+                naive_bytes += _memory(chunk)
+                if date_formats is None:
+                    # Decide date columns and their formats once, from the first chunk
+                    date_formats = detect_date_formats(chunk)
+                chunk = optimize_frame(chunk, date_formats)
+                failed = unparsed_dates(chunk, date_formats)
+                for column in failed:
+                    del date_formats[column]
+                if failed and chunks:
+                    # Earlier chunks hold these columns as dates: read again keeping them as text
+                    restart = True
+                    break
+                chunks.append(chunk)
+        if not restart:
+            return chunks, naive_bytes, date_formats or {}
+        if hasattr(file, "seek"):
+            file.seek(0)
+
+
+def load_dataset(file, name=None, chunk_rows=CHUNK_ROWS):
+    """Load an uploaded file into an optimized DataFrame; returns (df, report)"""
+    name = name or getattr(file, "name", "")
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    start = time.perf_counter()
+
+    if extension == "csv":
+        chunks, naive_bytes, date_formats = _read_csv(file, chunk_rows)
+        df = _combine(chunks) if chunks else pd.DataFrame()
+        # A column can be low-cardinality overall but not within some chunks
+        df = optimize_frame(df) if len(chunks) > 1 else df
+    else:
+        if extension == "parquet":
+            df = pd.read_parquet(file)
+        elif extension == "feather":
+            df = pd.read_feather(file)
+        else:
+            df = pd.read_excel(file)
+        naive_bytes = _memory(df)
+        date_formats = detect_date_formats(df)
+        df = optimize_frame(df, date_formats)
+        for column in unparsed_dates(df, date_formats):
+            del date_formats[column]
+
+    report = {
+        "format": extension or "excel",
+        "rows": len(df),
+        "columns": df.shape[1],
+        "seconds": time.perf_counter() - start,
+        "memory_before": naive_bytes,
+        "memory_after": _memory(df),
+        # Only the columns actually converted to datetime
+        "date_columns": sorted(date_formats),
+        "categorical_columns": [c for c in df.columns if isinstance(df[c].dtype, pd.CategoricalDtype)],
+    }
+    return df, report
+
+
+def format_bytes(num_bytes):
+    for unit in ("B", "KB", "MB", "GB"):
+        if num_bytes < 1024 or unit == "GB":
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
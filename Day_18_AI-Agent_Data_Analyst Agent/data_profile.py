@@ -0,0 +1,106 @@
+"""Column profile of a dataset, computed once and reused by every rerun and prompt.
+
+The profile replaces separate ``df.info()``, ``describe()``, ``dtypes`` and
+``isnull().sum()`` scans with one vectorized pass per column block:
+
+- missing counts for all columns in a single ``isna().sum()``
+- min / max / mean / std of every numeric column in one ``agg`` call
+- min / max of date columns, value counts of categorical columns
+
+Frames with more than ``PROFILE_SAMPLE_ROWS`` rows are profiled in
+approximate mode: counts, min, max, mean and std stay exact (they are cheap
+vectorized reductions), while the expensive order statistics (quartiles),
+distinct counts and top values of free text come from a fixed random sample.
+"""
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+PROFILE_SAMPLE_ROWS = int(os.getenv("PROFILE_SAMPLE_ROWS", "200000"))
+TOP_VALUES = 3
+
+
+def file_content_hash(file):
+    """Hash of an uploaded file's bytes, used as the profile cache key"""
+    hasher = hashlib.blake2b(digest_size=16)
+    file.seek(0)
+    for block in iter(lambda: file.read(1 << 20), b""):
+        hasher.update(block)
+    file.seek(0)
+    return hasher.hexdigest()
+
+
+def _scalar(value):
+    """numpy / pandas scalars to plain Python values (NaN and NaT become None)"""
+    if pd.isna(value):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def profile_dataframe(df, sample_rows=PROFILE_SAMPLE_ROWS):
+    """Per-column statistics of ``df``; approximate (sampled) above ``sample_rows`` rows"""
+    rows = len(df)
+    approximate = rows > sample_rows
+    # Fixed sample positions, gathered only for the columns that need them
+    positions = np.sort(np.random.default_rng(0).choice(rows, sample_rows, replace=False)) if approximate else None
+
+    def sampled(frame):
+        return frame.iloc[positions] if approximate else frame
+
+    missing = df.isna().sum()
+    columns = {
+        column: {"dtype": str(df[column].dtype), "missing": int(missing[column])}
+        for column in df.columns
+    }
+
+    numeric = df.select_dtypes(include="number", exclude="bool")
+    if numeric.shape[1]:
+        stats = numeric.agg(["min", "max", "mean", "std"])
+        quartiles = sampled(numeric).quantile([0.25, 0.5, 0.75])
+        for column in numeric.columns:
+            columns[column].update(
+                kind="numeric",
+                min=_scalar(stats.at["min", column]),
+                max=_scalar(stats.at["max", column]),
+                mean=_scalar(stats.at["mean", column]),
+                std=_scalar(stats.at["std", column]),
+                quartiles=[_scalar(q) for q in quartiles[column]],
+            )
+
+    dates = df.select_dtypes(include="datetime")
+    if dates.shape[1]:
+        bounds = dates.agg(["min", "max"])
+        for column in dates.columns:
+            columns[column].update(
+                kind="datetime",
+                min=_scalar(bounds.at["min", column]),
+                max=_scalar(bounds.at["max", column]),
+            )
+
+    for column in df.columns:
+        info = columns[column]
+        if "kind" in info:
+            continue
+        # Categorical codes make exact counts cheap; free text is counted on the
+        # sample and its counts scaled up to the full frame
+        exact = isinstance(df[column].dtype, pd.CategoricalDtype) or not approximate
+        counts = (df[column] if exact else sampled(df[column])).value_counts(dropna=True)
+        counts = counts[counts > 0]
+        if not exact:
+            counts = (counts * (rows / sample_rows)).round().astype(int)
+        info.update(
+            kind="categorical",
+            unique=int(len(counts)),
+            top=[(str(value), int(count)) for value, count in counts.head(TOP_VALUES).items()],
+        )
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "approximate": approximate,
+        "sample_rows": sample_rows if approximate else rows,
+    }
@@ -1,17 +1,25 @@
 import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
-import seaborn as sns
 import google.generativeai as genai
-import io
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
+import plotly.io as pio
 import json
 import os
-from PIL import Image
+import sys
+import time
 from dotenv import load_dotenv
 
+# Shared helpers (token estimates, latency stats) live at the repository root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from latency_metrics import LatencyTracker
+from token_budget import estimate_tokens
+
+from data_loader import SUPPORTED_TYPES, format_bytes, load_dataset
+from data_profile import file_content_hash, profile_dataframe
+from query_plan import execute_plan, narration_prompt, parse_plan, plan_prompt
+from schema_context import SCHEMA_SHORT_TOKEN_BUDGET, build_schema_context
+from viz_executor import VisualizationExecutor
+
 # Load environment variables
 load_dotenv()
 
@@ -141,17 +149,25 @@ if 'data' not in st.session_state:
     st.session_state.data = None
 if 'data_description' not in st.session_state:
     st.session_state.data_description = None
+if 'data_summary' not in st.session_state:
+    st.session_state.data_summary = None
 if 'history' not in st.session_state:
     st.session_state.history = []
 if 'file_name' not in st.session_state:
     st.session_state.file_name = None
 if 'columns_info' not in st.session_state:
     st.session_state.columns_info = None
+if 'load_report' not in st.session_state:
+    st.session_state.load_report = None
+if 'data_hash' not in st.session_state:
+    st.session_state.data_hash = None
+if 'call_tokens' not in st.session_state:
+    st.session_state.call_tokens = {}
 
 # File uploader section with improved styling
 st.sidebar.markdown('<div class="sidebar-content">', unsafe_allow_html=True)
 st.sidebar.markdown('<h3>📁 Data Upload</h3>', unsafe_allow_html=True)
-uploaded_file = st.sidebar.file_uploader("Upload CSV or Excel file", type=['csv', 'xlsx'])
+uploaded_file = st.sidebar.file_uploader("Upload CSV, Excel, Parquet or Feather file", type=SUPPORTED_TYPES)
 
 # Add sample data option
 if not uploaded_file:
@@ -192,41 +208,41 @@ st.sidebar.markdown('</div>', unsafe_allow_html=True)
 
 # Helper functions for data processing and analysis
 def load_data(file):
-    """Load data from uploaded file into pandas DataFrame"""
-    # Determine file type and read accordingly
-    if file.name.endswith('.csv'):
-        df = pd.read_csv(file)
-    else:  # Excel file
-        df = pd.read_excel(file)
-    return df
+    """Load data from uploaded file into a memory-optimized pandas DataFrame"""
+    # CSVs are read in chunks with downcast numbers, categorical text and dates
+    # parsed once (see data_loader.py); returns the frame and a load report
+    return load_dataset(file)
 
-def get_data_description(df):
-    """Generate a comprehensive description of the dataframe"""
-    # Create a string buffer to capture dataframe info
-    buffer = io.StringIO()
-    df.info(buf=buffer)
-    info_str = buffer.getvalue()
-    
-    # Get basic statistics and shape information
-    stats = df.describe().to_string()
-    shape = f"Shape: {df.shape[0]} rows x {df.shape[1]} columns"
-    
-    # Get information about column types and missing values
-    column_types = df.dtypes.to_string()
-    missing_values = df.isnull().sum().to_string()
-    
-    # Compile all information into a comprehensive description
-    description = f"{shape}\n\nColumn Information:\n{column_types}\n\nMissing Values:\n{missing_values}\n\nSummary Statistics:\n{stats}\n\nInfo:\n{info_str}"
-    
-    return description
+@st.cache_data(show_spinner=False, max_entries=16)
+def get_column_profile(content_hash, _df):
+    """Single-pass column profile, computed once per file content (see data_profile.py)"""
+    # The DataFrame is not hashed; the file's content hash is the cache key
+    return profile_dataframe(_df)
+
+# Rolling Gemini call latency per entry point, also logged to JSONL
+@st.cache_resource
+def get_latency_tracker():
+    return LatencyTracker()
+
+def generate_content(prompt, stage, max_output_tokens=None):
+    """Call Gemini, recording the prompt/output size and latency of the call under ``stage``"""
+    prompt_tokens = estimate_tokens(prompt)
+    generation_config = {"max_output_tokens": max_output_tokens} if max_output_tokens else None
+    start = time.perf_counter()
+    response = model.generate_content(prompt, generation_config=generation_config)
+    output_tokens = estimate_tokens(response.text)
+    get_latency_tracker().record({stage: (time.perf_counter() - start) * 1000},
+                                 prompt_tokens=prompt_tokens, output_tokens=output_tokens)
+    st.session_state.call_tokens[stage] = (prompt_tokens, output_tokens)
+    return response
 
-def analyze_with_gemini(prompt, df_description=None, max_tokens=8192):
+def analyze_with_gemini(prompt, df_description=None, max_tokens=8192, stage="analysis"):
     """Use Gemini to analyze data based on a prompt"""
     if not GOOGLE_API_KEY:
         return "Please provide a valid API key to continue."
     
     try:
-        # Construct a prompt that includes data context
+        # Construct a prompt that includes the compact dataset context
         if df_description:
             system_prompt = f"""You are a data analysis assistant. Analyze the following dataset:
             
@@ -238,12 +254,34 @@ def analyze_with_gemini(prompt, df_description=None, max_tokens=8192):
         else:
             system_prompt = prompt
         
-        response = model.generate_content(system_prompt)
+        response = generate_content(system_prompt, stage)
         return response.text
     except Exception as e:
         return f"Error in generating analysis: {str(e)}"
 
-def generate_visualizations(df, query):
+def analyze_compute_first(df, question, df_description, data_key):
+    """Answer with exact numbers: Gemini plans a query, it runs locally, Gemini narrates the result"""
+    if not GOOGLE_API_KEY:
+        return "Please provide a valid API key to continue.", None, None
+    
+    # Step 1: a small query plan instead of a long guessed answer
+    plan_response = generate_content(plan_prompt(question, df_description), "query_plan", max_output_tokens=512)
+    plan = parse_plan(plan_response.text)
+    
+    # Step 2: compute on the full DataFrame in a worker process (see query_plan.py
+    # for what plans may do and viz_executor.py for the limits they run under)
+    result = execute_plan(df, plan, get_viz_executor(), data_key)
+    
+    # Step 3: only the small result table goes back to the model
+    narration = generate_content(narration_prompt(question, plan, result), "narration", max_output_tokens=1024)
+    return narration.text, plan, result
+
+# Pre-warmed worker processes shared by all sessions for running generated plot code
+@st.cache_resource
+def get_viz_executor():
+    return VisualizationExecutor()
+
+def generate_visualizations(df, query, df_description, data_key):
     """Generate visualizations based on user query using Gemini's suggestions"""
     if not GOOGLE_API_KEY:
         return "Please provide a valid API key to continue."
@@ -251,9 +289,9 @@ def generate_visualizations(df, query):
     try:
         # Create a prompt to ask for visualization code
         system_prompt = f"""You are a data visualization expert. Based on this dataset and query, generate Python code for a visualization.
+        The data is already loaded in a pandas DataFrame named 'df'.
         
-        Dataset columns: {', '.join(df.columns.tolist())}
-        Sample data: {df.head(3).to_string()}
+        {df_description}
         
         Query: {query}
         
@@ -265,7 +303,7 @@ def generate_visualizations(df, query):
         
         Do not include markdown code blocks or explanations, just the Python code that I can execute directly."""
         
-        response = model.generate_content(system_prompt)
+        response = generate_content(system_prompt, "visualization")
         code = response.text.strip()
         
         # Remove markdown code block indicators if present
@@ -278,38 +316,23 @@ def generate_visualizations(df, query):
         with st.expander("View Visualization Code"):
             st.code(code, language="python")
         
-        # Execute the code in a controlled environment to avoid duplicate displays
-        local_vars = {"df": df, "px": px, "go": go, "plt": plt, "np": np, "sns": sns, "pd": pd}
-        
-        # Clear any existing matplotlib figures to prevent leakage
-        plt.close('all')
-        
-        # Execute the code
-        exec(code, globals(), local_vars)
-        
-        # Get the figure and return it
-        if 'fig' in local_vars:
-            return local_vars['fig']
-        else:
-            return "No visualization was generated by the code."
+        # Execute the code in an isolated worker process with time and memory limits
+        # (see viz_executor.py); the figure comes back as Plotly JSON or PNG bytes
+        kind, payload = get_viz_executor().run(code, data_key, df)
+        if kind == "plotly":
+            return pio.from_json(payload)
+        return payload
     except Exception as e:
         return f"Error generating visualization: {str(e)}"
 
-def get_recommendations(df):
+def get_recommendations(df_description):
     """Get recommendations for further analysis based on the dataset"""
     if not GOOGLE_API_KEY:
         return "Please provide a valid API key to continue."
     
     prompt = f"""You are a data science expert. Based on this dataset:
     
-    Column Information:
-    {df.dtypes.to_string()}
-    
-    Data Sample:
-    {df.head(5).to_string()}
-    
-    Missing Values:
-    {df.isnull().sum().to_string()}
+    {df_description}
     
     Please provide 5 specific recommendations for additional analyses or visualizations that would yield valuable insights from this data.
     Format your response as JSON with the structure:
@@ -320,7 +343,7 @@ def get_recommendations(df):
     Limit your response to ONLY the JSON array."""
     
     try:
-        response = model.generate_content(prompt)
+        response = generate_content(prompt, "recommendations")
         text = response.text.strip()
         
         # Extract JSON if it's wrapped in markdown code blocks or other text
@@ -342,27 +365,32 @@ if uploaded_file is not None:
         # Check if this is a new file
         if st.session_state.file_name != uploaded_file.name:
             # Load the data
-            df = load_data(uploaded_file)
+            data_hash = file_content_hash(uploaded_file)
+            df, load_report = load_data(uploaded_file)
             
             # Store in session state
             st.session_state.data = df
             st.session_state.file_name = uploaded_file.name
+            st.session_state.load_report = load_report
+            st.session_state.data_hash = data_hash
             
-            # Generate and store data description
-            st.session_state.data_description = get_data_description(df)
+            # Generate and store the compact, token-budgeted data description; prompts that
+            # only need the columns (visualization, column analysis) get the short summary
+            profile = get_column_profile(data_hash, df)
+            st.session_state.data_description = build_schema_context(profile)
+            st.session_state.data_summary = build_schema_context(profile, SCHEMA_SHORT_TOKEN_BUDGET, detailed=False)
             
             # Analyze column info for better understanding
             column_analysis_prompt = f"""
             Analyze these dataset columns:
-            {df.dtypes.to_string()}
+            {st.session_state.data_summary}
             
             For each column, provide a short description of what it likely represents based on the name, data type, 
-            and these sample values:
-            {df.head(3).to_string()}
+            and the ranges and distinct counts above.
             
             Return a JSON object where keys are column names and values are descriptions.
             """
-            column_info_response = analyze_with_gemini(column_analysis_prompt)
+            column_info_response = analyze_with_gemini(column_analysis_prompt, stage="column_analysis")
             
             # Extract JSON if response contains explanatory text
             try:
@@ -381,6 +409,7 @@ if uploaded_file is not None:
             st.session_state.history = []
         
         df = st.session_state.data
+        profile = get_column_profile(st.session_state.data_hash, df)
 
     # Display dataset information in the main area
     st.markdown('<div class="sub-header">Dataset Overview</div>', unsafe_allow_html=True)
@@ -403,14 +432,24 @@ if uploaded_file is not None:
         with metrics_cols[1]:
             st.metric(label="Columns", value=df.shape[1])
         with metrics_cols[2]:
-            missing_percent = (df.isnull().sum().sum() / (df.shape[0] * df.shape[1]) * 100)
+            total_missing = sum(info["missing"] for info in profile["columns"].values())
+            missing_percent = (total_missing / (df.shape[0] * df.shape[1]) * 100) if df.size else 0.0
             st.metric(label="Missing Data", value=f"{missing_percent:.1f}%")
         with metrics_cols[3]:
-            numeric_cols = df.select_dtypes(include=['number']).columns
-            if len(numeric_cols) > 0:
-                st.metric(label="Numeric Columns", value=len(numeric_cols))
-            else:
-                st.metric(label="Numeric Columns", value="0")
+            numeric_cols = [col for col, info in profile["columns"].items() if info["kind"] == "numeric"]
+            st.metric(label="Numeric Columns", value=len(numeric_cols))
+        
+        # Loading cost: time taken and memory saved by the dtype optimizations
+        load_report = st.session_state.load_report
+        if load_report:
+            before, after = load_report["memory_before"], load_report["memory_after"]
+            saved = (1 - after / before) * 100 if before else 0.0
+            st.caption(
+                f"Loaded {load_report['format'].upper()} in {load_report['seconds']:.2f}s · "
+                f"memory {format_bytes(before)} → {format_bytes(after)} (-{saved:.0f}%) · "
+                f"{len(load_report['categorical_columns'])} categorical, "
+                f"date columns: {', '.join(map(str, load_report['date_columns'])) or 'none'}"
+            )
     
     with col2:
         # Display column information with improved styling
@@ -419,15 +458,21 @@ if uploaded_file is not None:
         if st.session_state.columns_info and "error" not in st.session_state.columns_info:
             for col in df.columns:
                 if col in st.session_state.columns_info:
-                    with st.expander(f"{col} ({df[col].dtype})"):
+                    # Column stats come from the cached profile, not a rescan per rerun
+                    info = profile["columns"][col]
+                    with st.expander(f"{col} ({info['dtype']})"):
                         st.markdown(f"**Description**: {st.session_state.columns_info[col]}")
-                        st.markdown(f"**Missing**: {df[col].isnull().sum()} values ({df[col].isnull().sum() / len(df) * 100:.1f}%)")
-                        if pd.api.types.is_numeric_dtype(df[col]):
-                            st.markdown(f"**Range**: {df[col].min()} to {df[col].max()}")
-                            st.markdown(f"**Mean**: {df[col].mean():.2f}")
+                        missing_share = info["missing"] / len(df) * 100 if len(df) else 0.0
+                        st.markdown(f"**Missing**: {info['missing']} values ({missing_share:.1f}%)")
+                        if info["kind"] == "numeric":
+                            st.markdown(f"**Range**: {info['min']} to {info['max']}")
+                            if info["mean"] is not None:
+                                st.markdown(f"**Mean**: {info['mean']:.2f}")
         else:
             for col in df.columns:
                 st.text(f"• {col} ({df[col].dtype})")
+        if profile["approximate"]:
+            st.caption(f"Quartiles and text value counts estimated from a {profile['sample_rows']:,}-row sample")
     
     st.markdown('</div>', unsafe_allow_html=True)
     
@@ -460,15 +505,35 @@ if uploaded_file is not None:
                 analysis_query = question
                 st.rerun()
         
+        compute_first = st.checkbox(
+            "Compute exact answers locally",
+            value=True,
+            help="Gemini writes a pandas/SQL query, the agent runs it on the full dataset and Gemini explains the result"
+        )
+        
         if st.button("Analyze", key="analyze_btn", use_container_width=True):
             if not analysis_query:
                 st.warning("Please enter a question to analyze.")
             else:
                 with st.spinner("Generating analysis..."):
-                    analysis = analyze_with_gemini(analysis_query, st.session_state.data_description)
+                    plan = result = None
+                    if compute_first:
+                        try:
+                            analysis, plan, result = analyze_compute_first(
+                                df, analysis_query, st.session_state.data_description, st.session_state.data_hash
+                            )
+                        except Exception as e:
+                            # Questions that are not a computation fall back to a direct answer
+                            st.info(f"Could not compute this locally ({e}); answering from the dataset summary instead.")
+                    if plan is None:
+                        analysis = analyze_with_gemini(analysis_query, st.session_state.data_description)
                     st.session_state.history.append({"query": analysis_query, "type": "analysis", "result": analysis})
                     st.markdown("### Analysis Results")
                     st.markdown(analysis)
+                    if plan is not None:
+                        with st.expander("View Computed Result"):
+                            st.code(plan["code"], language="sql" if plan["language"] == "sql" else "python")
+                            st.dataframe(result.head(1000), use_container_width=True)
         st.markdown('</div>', unsafe_allow_html=True)
     
     with tab2:
@@ -502,10 +567,15 @@ if uploaded_file is not None:
                     # Clear previous matplotlib figures to prevent duplication
                     plt.close('all')
                     
-                    viz_result = generate_visualizations(df, viz_query)
+                    viz_result = generate_visualizations(
+                        df, viz_query, st.session_state.data_summary, st.session_state.data_hash
+                    )
                     
                     if isinstance(viz_result, str):
                         st.error(viz_result)
+                    elif isinstance(viz_result, bytes):
+                        # Matplotlib figures are rendered to PNG by the worker
+                        st.image(viz_result)
                     else:
                         try:
                             # For Plotly figures with improved appearance
@@ -540,7 +610,7 @@ if uploaded_file is not None:
         
         if st.button("Generate Recommendations", key="rec_btn", use_container_width=True):
             with st.spinner("Generating recommendations..."):
-                recommendations = get_recommendations(df)
+                recommendations = get_recommendations(st.session_state.data_description)
                 st.session_state.history.append({"type": "recommendations", "result": recommendations})
                 
                 # Display recommendations with improved styling
@@ -663,4 +733,20 @@ else:
                 <h3>{feature["icon"]} {feature["title"]}</h3>
                 <p>{feature["description"]}</p>
             </div>
-            ''', unsafe_allow_html=True) 
\ No newline at end of file
+            ''', unsafe_allow_html=True) 
+
+# Gemini call panel (rendered last so it includes this run's calls)
+latency_summary = get_latency_tracker().summary()
+if latency_summary:
+    st.sidebar.markdown('<h3>⏱️ Gemini Calls</h3>', unsafe_allow_html=True)
+    st.sidebar.table([
+        {
+            "call": stage,
+            "prompt tokens": st.session_state.call_tokens.get(stage, ("-", "-"))[0],
+            "output tokens": st.session_state.call_tokens.get(stage, ("-", "-"))[1],
+            "p50 (s)": f"{stats['p50'] / 1000:.1f}",
+            "p95 (s)": f"{stats['p95'] / 1000:.1f}",
+            "n": stats["count"],
+        }
+        for stage, stats in latency_summary.items()
+    ])
\ No newline at end of file
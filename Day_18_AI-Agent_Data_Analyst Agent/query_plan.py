@@ -0,0 +1,216 @@
+"""Compute-first analysis: Gemini plans a query, the agent computes it locally.
+
+Instead of asking the model to guess numbers from summary statistics, the
+analysis runs in two short LLM calls around a local computation:
+
+1. Gemini returns a small JSON plan: one restricted pandas expression over
+   ``df`` or, when ``duckdb`` is installed, one SQL ``SELECT`` over table ``df``
+2. the plan is validated and executed on the loaded DataFrame (vectorized
+   pandas in a visualization worker, or DuckDB reading the frame in place)
+3. only the result table, truncated to ``PLAN_MAX_RESULT_ROWS`` rows, goes back
+   to Gemini to be narrated
+
+Pandas plans are parsed and checked against an allow-list before evaluation:
+a single expression, no lambdas, comprehensions or dunder access, only the
+names ``df``, ``pd`` and ``np`` (with a short list of their functions), no
+methods that write files or run arbitrary callables, and no arithmetic on
+literals alone. The allow-list does not bound what a plan costs
+(``pd.concat([df] * 10**6)`` is valid), so given a ``VisualizationExecutor``
+the plan is evaluated in its worker processes, under their timeout and memory
+limit, instead of in the app's process.
+"""
+import ast
+import importlib.util
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from data_loader import plain_frame
+from viz_executor import VizError
+
+PLAN_MAX_RESULT_ROWS = int(os.getenv("PLAN_MAX_RESULT_ROWS", "50"))
+
+ALLOWED_NODES = (
+    ast.Expression, ast.Call, ast.Attribute, ast.Name, ast.Constant, ast.Subscript, ast.Slice,
+    ast.Tuple, ast.List, ast.Dict, ast.Compare, ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.keyword,
+    ast.Load, ast.operator, ast.boolop, ast.cmpop, ast.unaryop,
+)
+MODULE_FUNCTIONS = {
+    "pd": {"to_datetime", "to_numeric", "cut", "qcut", "Grouper", "NamedAgg", "concat", "crosstab",
+           "pivot_table", "Timestamp", "Timedelta", "DateOffset", "isna", "notna"},
+    "np": {"abs", "sqrt", "log", "log1p", "exp", "round", "where", "clip", "mean", "median", "std",
+           "sum", "min", "max", "percentile", "quantile", "corrcoef", "nan", "inf", "number"},
+}
+# Methods that write files, evaluate strings or call arbitrary functions
+BLOCKED_METHODS = {
+    "apply", "applymap", "map", "pipe", "eval", "query", "transform", "plot", "style",
+    "tofile", "dump", "dumps", "save", "memmap",
+}
+SAFE_TO_METHODS = {"to_frame", "to_period", "to_timestamp", "to_numpy", "to_list", "to_dict"}
+MAX_EXPONENT = 10
+
+
+class PlanError(ValueError):
+    """The model's plan could not be parsed, validated or executed"""
+
+
+def sql_available():
+    return importlib.util.find_spec("duckdb") is not None
+
+
+def plan_prompt(question, df_description, allow_sql=None):
+    """Prompt asking Gemini for a query plan instead of an answer"""
+    allow_sql = sql_available() if allow_sql is None else allow_sql
+    languages = ('"pandas" or "sql"' if allow_sql else '"pandas"')
+    sql_rule = ("\n    - sql: one SELECT statement over the table df (DuckDB dialect)" if allow_sql else "")
+    return f"""You are a data analyst. Do not answer the question yourself. Write a query that computes
+    the answer from the dataset, which is loaded as a pandas DataFrame named df:
+
+    {df_description}
+
+    Question: {question}
+
+    Return ONLY a JSON object: {{"language": {languages}, "code": "<query>"}}
+    - pandas: one expression over df using pandas methods (pd and np are available); no lambdas,
+      no assignments, no apply/map/query/eval, no file access{sql_rule}
+    Make the result small: aggregate, sort and limit to the rows needed to answer."""
+
+
+def parse_plan(text):
+    """Extract ``{"language", "code"}`` from the model's reply"""
+    text = text.strip()
+    if "```" in text:
+        text = text.split("```")[1]
+        text = text[len("json"):] if text.startswith("json") else text
+    try:
+        plan = json.loads(text.strip())
+        language, code = plan["language"].lower(), plan["code"].strip()
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        raise PlanError(f"Could not parse the query plan: {e}") from e
+    if language not in ("pandas", "sql"):
+        raise PlanError(f"Unsupported plan language {language!r}")
+    return {"language": language, "code": code}
+
+
+def _blocked_name(name):
+    return name.startswith("_") or name in BLOCKED_METHODS or \
+        (name.startswith("to_") and name not in SAFE_TO_METHODS)
+
+
+def validate_pandas(expression):
+    """Parse a pandas plan and reject anything outside the allow-list; returns the compiled code"""
+    try:
+        tree = ast.parse(expression, mode="eval")
+    except SyntaxError as e:
+        raise PlanError(f"Plan is not a single Python expression: {e.msg}") from e
+    for node in ast.walk(tree):
+        if not isinstance(node, ALLOWED_NODES):
+            raise PlanError(f"{type(node).__name__} is not allowed in a query plan")
+        if isinstance(node, ast.Name) and node.id not in ("df", "pd", "np"):
+            raise PlanError(f"Unknown name {node.id!r}; plans may only use df, pd and np")
+        if isinstance(node, ast.Attribute):
+            name = node.attr
+            if _blocked_name(name):
+                raise PlanError(f"Attribute {name!r} is not allowed in a query plan")
+            if isinstance(node.value, ast.Name) and node.value.id in MODULE_FUNCTIONS \
+                    and name not in MODULE_FUNCTIONS[node.value.id]:
+                raise PlanError(f"{node.value.id}.{name} is not allowed in a query plan")
+        # agg("...") and aggfunc="..." look methods up by name
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and _blocked_name(node.value):
+            raise PlanError(f"{node.value!r} is not allowed in a query plan")
+        # Obvious blow-ups on literals alone ("x" * 10**9, 9**9**9) are rejected up front
+        if isinstance(node, ast.BinOp):
+            if isinstance(node.left, ast.Constant) and isinstance(node.right, ast.Constant):
+                raise PlanError("Arithmetic on constants only is not allowed in a query plan")
+            if isinstance(node.op, ast.Pow) and not (
+                    isinstance(node.right, ast.Constant) and isinstance(node.right.value, (int, float))
+                    and abs(node.right.value) <= MAX_EXPONENT):
+                raise PlanError(f"Exponents must be constants up to {MAX_EXPONENT}")
+    return compile(tree, "<query plan>", "eval")
+
+
+def run_sql(df, query):
+    """Run one SELECT over ``df`` with DuckDB (needs ``duckdb`` installed)"""
+    statement = query.strip().rstrip(";").strip()
+    if ";" in statement or not statement.lower().startswith(("select", "with")):
+        raise PlanError("SQL plans must be a single SELECT statement")
+    try:
+        import duckdb
+    except ImportError as e:
+        raise PlanError("SQL plans need duckdb installed") from e
+    # No file or network access: the only table is the loaded DataFrame
+    connection = duckdb.connect(config={"enable_external_access": False})
+    try:
+        connection.register("df", df)
+        return connection.execute(statement).df()
+    except duckdb.Error as e:
+        raise PlanError(f"SQL plan failed: {e}") from e
+    finally:
+        connection.close()
+
+
+def as_frame(result):
+    """Normalize a plan result (scalar, Series, DataFrame, array) to a DataFrame"""
+    if isinstance(result, pd.DataFrame):
+        return result
+    if isinstance(result, pd.Series):
+        return result.to_frame(name=result.name if result.name is not None else "value")
+    if isinstance(result, (np.ndarray, list, tuple)):
+        return pd.DataFrame({"value": list(result)})
+    return pd.DataFrame({"value": [result]})
+
+
+def evaluate_pandas(df, expression):
+    """Validate and evaluate a pandas plan in this process; returns the result as a DataFrame"""
+    code = validate_pandas(expression)
+    try:
+        result = eval(code, {"__builtins__": {}}, {"df": df, "pd": pd, "np": np})
+    except MemoryError:
+        # Left to the worker, which reports the memory limit and is replaced
+        raise
+    except Exception as e:
+        raise PlanError(f"Plan failed: {type(e).__name__}: {e}") from e
+    return as_frame(result)
+
+
+def execute_plan(df, plan, executor=None, key=None):
+    """Run a validated plan on ``df``; returns the full result as a DataFrame.
+
+    With ``executor`` (a ``VisualizationExecutor``), pandas plans run in its
+    workers against the frame published under ``key``.
+    """
+    if plan["language"] == "sql":
+        return run_sql(df, plan["code"])
+    if executor is None:
+        return evaluate_pandas(plain_frame(df), plan["code"])
+    # Rejected plans never reach a worker
+    validate_pandas(plan["code"])
+    try:
+        return executor.run_plan(plan["code"], key, df)
+    except VizError as e:
+        raise PlanError(str(e)) from e
+
+
+def result_text(result, max_rows=PLAN_MAX_RESULT_ROWS):
+    """The (truncated) result table as text for the narration prompt"""
+    text = result.head(max_rows).to_string()
+    if len(result) > max_rows:
+        text += f"\n... {len(result) - max_rows:,} more rows not shown"
+    return text
+
+
+def narration_prompt(question, plan, result, max_rows=PLAN_MAX_RESULT_ROWS):
+    """Prompt asking Gemini to explain an exactly computed result"""
+    return f"""You are a data analysis assistant. The question below was answered by running this
+    {plan['language']} query on the full dataset:
+
+    {plan['code']}
+
+    Result:
+    {result_text(result, max_rows)}
+
+    Question: {question}
+
+    Explain the answer concisely using the exact numbers in the result. Do not recompute or estimate values."""
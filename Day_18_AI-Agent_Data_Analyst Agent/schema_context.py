@@ -0,0 +1,124 @@
+"""Compact, token-budgeted dataset context for Gemini prompts.
+
+Built from the cached column profile (see data_profile.py) instead of pasting
+``df.info()``, ``describe()``, dtypes and ``df.head()`` dumps into every prompt:
+each column appears exactly once, ordered by how informative it is, and the
+context is cut to ``SCHEMA_TOKEN_BUDGET`` tokens:
+
+1. every column gets a short line (type, range or distinct count) in rank
+   order while the budget allows, keeping room to name the columns left over
+2. the remaining budget upgrades the top-ranked lines to full statistics
+   (mean, std, quartiles, top values)
+3. columns without a line are still listed by name, so generated code can
+   reference them
+
+Prompts that only need to know what the columns are (visualization code,
+column descriptions) get the short lines alone, under the smaller
+``SCHEMA_SHORT_TOKEN_BUDGET``, so the context never outgrows the column list
+and three sample rows those prompts used to carry.
+"""
+import os
+
+from token_budget import estimate_tokens
+
+SCHEMA_TOKEN_BUDGET = int(os.getenv("SCHEMA_TOKEN_BUDGET", "800"))
+SCHEMA_SHORT_TOKEN_BUDGET = int(os.getenv("SCHEMA_SHORT_TOKEN_BUDGET", "150"))
+MAX_VALUE_CHARS = 40
+
+
+def _format_number(value):
+    if value is None:
+        return "n/a"
+    if isinstance(value, float):
+        return f"{value:,.4g}" if abs(value) < 1e6 else f"{value:,.0f}"
+    return f"{value:,}" if isinstance(value, int) else str(value)
+
+
+def _format_date(value):
+    return value[:-9] if value and value.endswith("T00:00:00") else value
+
+
+def _clip(value):
+    return value if len(value) <= MAX_VALUE_CHARS else value[:MAX_VALUE_CHARS - 3] + "..."
+
+
+def column_score(info, rows, sample_rows):
+    """Informativeness of a column: varying, mostly filled columns first, IDs and constants last"""
+    kind = info["kind"]
+    present = 1 - info["missing"] / rows if rows else 0.0
+    if kind == "numeric":
+        score = 3.0 if info["std"] else 0.2
+    elif kind == "datetime":
+        score = 3.5 if info["min"] != info["max"] else 0.2
+    elif info["unique"] <= 1:
+        score = 0.2
+    elif info["unique"] > 0.9 * sample_rows * present:
+        # Identifier-like text: useful to know about, useless to group by
+        score = 0.5
+    else:
+        score = 2.5
+    return score * present
+
+
+def short_line(column, info, rows):
+    parts = [f"- {column} ({info['dtype']})"]
+    if info["kind"] == "numeric":
+        parts.append(f"{_format_number(info['min'])} to {_format_number(info['max'])}")
+    elif info["kind"] == "datetime":
+        parts.append(f"{_format_date(info['min'])} to {_format_date(info['max'])}")
+    else:
+        parts.append(f"{info['unique']:,} distinct")
+    if info["missing"]:
+        parts.append(f"{info['missing'] / rows * 100:.0f}% missing")
+    return ": ".join(parts[:2]) + "".join(f", {part}" for part in parts[2:])
+
+
+def detailed_line(column, info, rows):
+    line = short_line(column, info, rows)
+    if info["kind"] == "numeric":
+        quartiles = "/".join(_format_number(q) for q in info["quartiles"])
+        line += f"; mean {_format_number(info['mean'])}, std {_format_number(info['std'])}, quartiles {quartiles}"
+    elif info["kind"] == "categorical" and info["top"]:
+        line += "; e.g. " + ", ".join(f"{_clip(value)} ({count:,})" for value, count in info["top"])
+    return line
+
+
+def build_schema_context(profile, budget=SCHEMA_TOKEN_BUDGET, detailed=True):
+    """Deduplicated dataset description of at most ~``budget`` tokens, most informative columns first.
+
+    With ``detailed=False`` no line is upgraded to full statistics.
+    """
+    rows, columns = profile["rows"], profile["columns"]
+    header = f"Dataset: {rows:,} rows x {len(columns)} columns"
+    if profile["approximate"]:
+        header += f" (quartiles and value counts from a {profile['sample_rows']:,}-row sample)"
+    header += ". Columns, most informative first:"
+
+    ranked = sorted(columns, key=lambda c: -column_score(columns[c], rows, profile["sample_rows"]))
+    # Tokens needed to name ranked[i:] in the trailing "Other columns" line
+    name_costs = [0] * (len(ranked) + 1)
+    for i in range(len(ranked) - 1, -1, -1):
+        name_costs[i] = name_costs[i + 1] + estimate_tokens(f"{ranked[i]}, ")
+
+    lines = {}
+    used = estimate_tokens(header)
+    for i, column in enumerate(ranked):
+        cost = estimate_tokens(short_line(column, columns[column], rows)) + 1
+        if used + cost + name_costs[i + 1] > budget:
+            break
+        lines[column] = short_line(column, columns[column], rows)
+        used += cost
+
+    omitted = ranked[len(lines):]
+    used += name_costs[len(lines)]
+    for column in lines if detailed else ():
+        detail = detailed_line(column, columns[column], rows)
+        extra = estimate_tokens(detail) - estimate_tokens(lines[column])
+        if used + extra <= budget:
+            lines[column] = detail
+            used += extra
+
+    context = "\n".join([header, *lines.values()])
+    if omitted:
+        context += f"\nOther columns ({len(omitted)}): " + ", ".join(map(str, omitted))
+    return context
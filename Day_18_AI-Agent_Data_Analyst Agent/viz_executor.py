@@ -0,0 +1,376 @@
+"""Isolated execution of model-written visualization code and query plans.
+
+Generated code used to run with ``exec`` inside the Streamlit server, where one
+runaway loop or giant plot stalls every session. ``VisualizationExecutor``
+runs it in a pool of worker processes instead:
+
+- workers are started ahead of time and import pandas, plotly, matplotlib and
+  seaborn once, so a job only pays for running the code
+- the DataFrame is published once per dataset as an Arrow file in shared
+  memory (``/dev/shm`` where available); each worker memory-maps it on first
+  use and keeps it, so nothing is pickled per call
+- every job gets a wall-clock timeout and an address-space limit on top of the
+  worker's baseline; a worker that times out or dies is killed and replaced by
+  a fresh pre-warmed one
+- the figure comes back serialized: Plotly figures as JSON, Matplotlib
+  figures as PNG bytes
+- workers run untrusted code, so nothing they send back is unpickled: each
+  reply is a JSON header plus raw bytes, and query plan results travel as an
+  Arrow IPC stream
+
+Pandas query plans (see query_plan.py) run in the same workers under the same
+limits through ``run_plan``: the allow-list keeps them from touching files or
+running arbitrary code, but cannot bound what a valid expression costs.
+"""
+import atexit
+import io
+import json
+import os
+import queue
+import tempfile
+import threading
+import multiprocessing as mp
+
+try:
+    import resource
+except ImportError:  # Windows: no address-space limits
+    resource = None
+
+VIZ_WORKERS = int(os.getenv("VIZ_WORKERS", "2"))
+VIZ_TIMEOUT_SECONDS = float(os.getenv("VIZ_TIMEOUT_SECONDS", "30"))
+VIZ_MEMORY_LIMIT_MB = int(os.getenv("VIZ_MEMORY_LIMIT_MB", "1024"))
+VIZ_MAX_RESULT_MB = int(os.getenv("VIZ_MAX_RESULT_MB", "20"))
+STARTUP_TIMEOUT_SECONDS = 120
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+class VizError(RuntimeError):
+    """Generated visualization code or a query plan failed, timed out or was killed"""
+
+
+def _address_space():
+    """Current virtual memory size of this process in bytes (Linux only), else None"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _limit_memory(limit_mb):
+    """Cap the address space at the current size plus ``limit_mb``; returns the previous limits"""
+    current = _address_space()
+    if resource is None or not limit_mb or current is None:
+        return None
+    previous = resource.getrlimit(resource.RLIMIT_AS)
+    soft = current + limit_mb * 1024 * 1024
+    if previous[1] != resource.RLIM_INFINITY:
+        soft = min(soft, previous[1])
+    resource.setrlimit(resource.RLIMIT_AS, (soft, previous[1]))
+    return previous
+
+
+def _load_frame(path):
+    # Generated code sees the dtypes of a plain pandas load, not the compact ones
+    from data_loader import plain_frame
+
+    if path.endswith(".pkl"):
+        import pandas as pd
+        return plain_frame(pd.read_pickle(path))
+    from pyarrow import feather
+    return plain_frame(feather.read_table(path, memory_map=True).to_pandas())
+
+
+def _render(code, df):
+    """Run generated code and serialize its ``fig``; returns (kind, payload)"""
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import pandas as pd
+    import plotly.express as px
+    import plotly.graph_objects as go
+    import seaborn as sns
+
+    plt.close("all")
+    namespace = {"df": df.copy(deep=False), "px": px, "go": go, "plt": plt, "np": np, "sns": sns, "pd": pd}
+    exec(code, namespace)
+    fig = namespace.get("fig")
+    if fig is None:
+        raise VizError("No visualization was generated by the code.")
+    if hasattr(fig, "to_json"):
+        return "plotly", fig.to_json()
+    if hasattr(fig, "savefig"):
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png", bbox_inches="tight")
+        plt.close("all")
+        return "png", buffer.getvalue()
+    raise VizError(f"'fig' is a {type(fig).__name__}, not a Plotly or Matplotlib figure")
+
+
+def frame_to_arrow(df):
+    """Serialize a result DataFrame, index included, as an Arrow IPC stream"""
+    import pyarrow as pa
+
+    # Arrow needs string field names; the pandas metadata keeps the index
+    df = df.rename(columns=str) if not all(isinstance(c, str) for c in df.columns) else df
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        # Mixed-type object columns are sent as text
+        mixed = {column: str for column in df.columns if df[column].dtype == object}
+        table = pa.Table.from_pandas(df.astype(mixed), preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def frame_from_arrow(payload):
+    """DataFrame from ``frame_to_arrow`` bytes"""
+    import pyarrow as pa
+
+    return pa.ipc.open_stream(payload).read_all().to_pandas()
+
+
+def _compute(expression, df):
+    """Evaluate a pandas query plan; returns ("frame", result DataFrame as Arrow IPC bytes)"""
+    from query_plan import PlanError, evaluate_pandas
+
+    try:
+        result = evaluate_pandas(df.copy(deep=False), expression)
+    except PlanError as e:
+        raise VizError(str(e)) from e
+    return "frame", frame_to_arrow(result)
+
+
+def _send(conn, message, payload=b""):
+    """Worker -> parent: a JSON header and raw payload bytes, never a pickle"""
+    header = json.dumps(message).encode("utf-8")
+    conn.send_bytes(len(header).to_bytes(4, "big") + header + payload)
+
+
+def _receive(conn):
+    """Parent side of ``_send``; returns (message, payload bytes)"""
+    data = conn.recv_bytes()
+    size = int.from_bytes(data[:4], "big")
+    return json.loads(data[4:4 + size]), data[4 + size:]
+
+
+def _worker_main(conn, memory_limit_mb):
+    """Worker process: import the plotting stack once, then run jobs until told to stop"""
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    for variable in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(variable, "1")
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+    import pandas as pd
+    import plotly.express  # noqa: F401
+    import seaborn  # noqa: F401
+    from pyarrow import feather  # noqa: F401
+    import data_loader  # noqa: F401
+    import query_plan  # noqa: F401
+    try:
+        # Shallow per-job copies of the cached frame stay isolated under copy-on-write
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, ValueError):
+        pass
+    _send(conn, ["ready", os.getpid()])
+
+    frames = {}
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if job is None:
+            break
+        job_kind, code, data_path = job
+        label = "Query plan" if job_kind == "plan" else "Visualization"
+        previous = None
+        try:
+            if data_path not in frames:
+                frames.clear()
+                frames[data_path] = _load_frame(data_path)
+            # The job's clock starts once the data is loaded
+            _send(conn, ["started"])
+            previous = _limit_memory(memory_limit_mb)
+            kind, payload = (_compute if job_kind == "plan" else _render)(code, frames[data_path])
+            if isinstance(payload, str):
+                payload = payload.encode("utf-8")
+            if len(payload) > VIZ_MAX_RESULT_MB * 1024 * 1024:
+                what = "Result" if job_kind == "plan" else "Figure"
+                raise VizError(f"{what} is larger than {VIZ_MAX_RESULT_MB} MB; aggregate or sample the data first")
+            reply = (["ok", kind], payload)
+        except MemoryError:
+            reply = (["error", f"{label} exceeded the {memory_limit_mb} MB memory limit", True], b"")
+        except VizError as e:
+            reply = (["error", str(e), False], b"")
+        except BaseException as e:
+            reply = (["error", f"{type(e).__name__}: {e}", False], b"")
+        finally:
+            if previous is not None:
+                resource.setrlimit(resource.RLIMIT_AS, previous)
+        _send(conn, *reply)
+        if reply[0][0] == "error" and reply[0][2]:
+            # After a MemoryError the interpreter state is suspect; let the pool replace us
+            break
+
+
+class _Worker:
+    def __init__(self, context, memory_limit_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        if not self.ready:
+            if not self.conn.poll(timeout):
+                raise VizError("Worker process did not start in time")
+            _receive(self.conn)
+            self.ready = True
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=2)
+        self.kill()
+
+
+class VisualizationExecutor:
+    """Pool of pre-warmed worker processes that render generated visualization code and run query plans"""
+
+    def __init__(self, workers=VIZ_WORKERS, timeout=VIZ_TIMEOUT_SECONDS, memory_limit_mb=VIZ_MEMORY_LIMIT_MB,
+                 data_dir=None, max_frames=4):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.data_dir = data_dir or (SHARED_MEMORY_DIR if os.path.isdir(SHARED_MEMORY_DIR) else tempfile.gettempdir())
+        self.max_frames = max_frames
+        # spawn: the Streamlit server is multi-threaded, so forking it is unsafe
+        self._context = mp.get_context("spawn")
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "failed": 0, "timeouts": 0, "restarts": 0}
+        for _ in range(workers):
+            self._spawn()
+        atexit.register(self.shutdown)
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.memory_limit_mb)
+        with self._lock:
+            self._workers.add(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            self._stats["restarts"] += 1
+        self._spawn()
+
+    def publish(self, key, df):
+        """Write ``df`` to shared memory once per ``key``; returns the file path workers read"""
+        with self._lock:
+            path = self._frames.get(key)
+            if path and os.path.exists(path):
+                # Most recently used last
+                self._frames[key] = self._frames.pop(key)
+                return path
+        base = os.path.join(self.data_dir, f"viz-frame-{os.getpid()}-{key}")
+        tmp = f"{base}.{threading.get_ident()}.tmp"
+        try:
+            from pyarrow import feather
+            feather.write_feather(df.reset_index(drop=True), tmp, compression="uncompressed")
+            path = base + ".arrow"
+        except (ImportError, TypeError, ValueError):
+            # Columns Arrow cannot represent (mixed-type objects) fall back to a pickle file
+            df.to_pickle(tmp)
+            path = base + ".pkl"
+        os.replace(tmp, path)
+        with self._lock:
+            self._frames[key] = path
+            stale = list(self._frames)[:-self.max_frames]
+            for old_key in stale:
+                self._remove(self._frames.pop(old_key))
+        return path
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def run(self, code, key, df):
+        """Render ``code`` against ``df`` in a worker; returns ("plotly", json) or ("png", bytes)"""
+        return self._submit("figure", code, key, df)
+
+    def run_plan(self, expression, key, df):
+        """Evaluate a pandas query plan against ``df`` in a worker; returns the result DataFrame"""
+        _, payload = self._submit("plan", expression, key, df)
+        return frame_from_arrow(payload)
+
+    def _submit(self, job_kind, code, key, df):
+        label = "Query plan" if job_kind == "plan" else "Visualization"
+        data_path = self.publish(key, df)
+        try:
+            worker = self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise VizError("All workers are busy, try again shortly") from None
+
+        reply = payload = None
+        try:
+            worker.wait_ready(STARTUP_TIMEOUT_SECONDS)
+            worker.conn.send((job_kind, code, data_path))
+            # Loading a new dataset into the worker is not charged to the job
+            message = _receive(worker.conn) if worker.conn.poll(STARTUP_TIMEOUT_SECONDS) else None
+            if message is not None and message[0][0] == "started":
+                message = _receive(worker.conn) if worker.conn.poll(self.timeout) else None
+            if message is None:
+                with self._lock:
+                    self._stats["timeouts"] += 1
+                raise VizError(f"{label} timed out after {self.timeout:.0f}s and was stopped")
+            reply, payload = message
+        except (EOFError, OSError, ValueError):
+            # ValueError: a reply that is not a well-formed header
+            worker.process.join(timeout=1)
+            raise VizError(f"{label} worker crashed (exit code {worker.process.exitcode})") from None
+        finally:
+            with self._lock:
+                self._stats["runs"] += 1
+                if reply is None or reply[0] == "error":
+                    self._stats["failed"] += 1
+            # Workers that timed out, crashed or ran out of memory are replaced
+            if reply is not None and not (reply[0] == "error" and reply[2]):
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+
+        if reply[0] == "error":
+            raise VizError(reply[1])
+        kind = reply[1]
+        return kind, payload.decode("utf-8") if kind == "plotly" else payload
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, workers=len(self._workers))
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = list(self._workers), set()
+            frames, self._frames = list(self._frames.values()), {}
+        for worker in workers:
+            worker.stop()
+        for path in frames:
+            self._remove(path)
@@ -0,0 +1,170 @@
+"""Concurrent, rate-limited batch embedding client.
+
+``AsyncBatchEmbeddings`` wraps any LangChain embeddings object and sends its
+texts in fixed-size batches on an asyncio event loop, with per-batch retries
+and exponential backoff. The cap on in-flight requests and the token-bucket
+rate limit are shared by every caller of the instance, even though each
+synchronous call runs its own event loop. One transient API error then costs a
+retry of that batch instead of the whole ingestion.
+"""
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain.embeddings.base import Embeddings
+
+from embedding_cache import embed_queries, embedding_model_name
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``rate`` tokens per second up to ``capacity``"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self):
+        # Take a token now, or return how long to wait before trying again
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self._reserve()
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class AsyncBatchEmbeddings(Embeddings):
+    """Embed texts in concurrent, rate-limited, retried batches"""
+
+    def __init__(self, embeddings, batch_size=32, max_in_flight=4, requests_per_second=5.0,
+                 burst=None, max_retries=5, base_delay=0.5, max_delay=30.0):
+        self.embeddings = embeddings
+        self.model_name = embedding_model_name(embeddings)
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.rate_limiter = TokenBucket(requests_per_second, burst)
+        # A threading semaphore, not an asyncio one: callers on other threads
+        # run their own event loops and must share the same in-flight cap
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.last_stats = None
+
+    async def _call_with_retry(self, fn, *args):
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            try:
+                return await asyncio.to_thread(fn, *args)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                # Full jitter keeps concurrent batches from retrying in lockstep
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                attempt += 1
+                logger.warning("Embedding batch failed (%s), retry %d in %.2fs", e, attempt, delay)
+                await asyncio.sleep(delay)
+
+    async def _acquire_slot(self):
+        # Poll rather than block, so waiting never ties up the event loop or a thread
+        while not self._slots.acquire(blocking=False):
+            await asyncio.sleep(0.01)
+
+    async def aembed_documents(self, texts, embed_batch_fn=None):
+        start = time.perf_counter()
+        embed_batch_fn = embed_batch_fn or self.embeddings.embed_documents
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        async def embed_batch(batch):
+            await self._acquire_slot()
+            try:
+                return await self._call_with_retry(embed_batch_fn, batch)
+            finally:
+                self._slots.release()
+
+        results = await asyncio.gather(*(embed_batch(batch) for batch in batches))
+        vectors = [vector for batch_vectors in results for vector in batch_vectors]
+
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "chunks": len(texts),
+            "batches": len(batches),
+            "seconds": elapsed,
+            "chunks_per_second": len(texts) / elapsed if elapsed > 0 else 0.0,
+        }
+        logger.info("Embedded %d chunks in %d batches at %.1f chunks/s",
+                    len(texts), len(batches), self.last_stats["chunks_per_second"])
+        return vectors
+
+    async def aembed_query(self, text):
+        return await self._call_with_retry(self.embeddings.embed_query, text)
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        return _run(self.aembed_documents(list(texts)))
+
+    def embed_query(self, text):
+        return _run(self.aembed_query(text))
+
+    def embed_queries(self, texts):
+        """Embed many search queries in the same concurrent, rate-limited batches as documents"""
+        if not texts:
+            return []
+        return _run(self.aembed_documents(list(texts), lambda batch: embed_queries(self.embeddings, batch)))
+
+
+def _run(coro):
+    """Run a coroutine to completion from synchronous code"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Already inside an event loop (e.g. an async server): use a helper thread
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+class HTTPEmbeddings(Embeddings):
+    """Minimal client for a JSON embedding endpoint.
+
+    The endpoint accepts ``{"texts": [...]}`` and returns ``{"embeddings": [...]}``;
+    ``benchmarks/embedding_stub_server.py`` implements it for local testing.
+    """
+
+    def __init__(self, url, model_name="http-embeddings", timeout=30):
+        self.url = url
+        self.model_name = model_name
+        self.timeout = timeout
+
+    def embed_documents(self, texts):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps({"texts": list(texts)}).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read())["embeddings"]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
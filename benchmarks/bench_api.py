@@ -0,0 +1,101 @@
+"""Load test of the RAG API's Document Assistant endpoint against a stubbed LLM.
+
+Starts ``rag_api`` in-process with the offline hashing embeddings and a fake
+chat model that streams a fixed answer with a per-character delay, then fires
+waves of concurrent clients at ``POST /assistant/query``. Because the LLM wait
+is awaited on the event loop, throughput should grow almost linearly with the
+number of concurrent clients until the CPU-bound retrieval work saturates.
+Needs ``fastapi``, ``uvicorn`` and ``langchain``. Run from the repository root:
+
+    python -m benchmarks.bench_api --requests 200 --concurrency 1 10 50 100
+"""
+import argparse
+import json
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+
+try:
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+except ImportError:
+    from langchain.chat_models.fake import FakeListChatModel
+
+import rag_api
+from latency_metrics import percentile
+from local_embeddings import HashingEmbeddings
+from rag_pipeline import build_qa_chain
+
+STUB_ANSWER = "Retrieval-augmented generation grounds answers in retrieved documents."
+QUESTIONS = [
+    "What is FAISS?",
+    "How does RAG enhance generative models?",
+    "Explain RLHF",
+    "What is prompt engineering?",
+]
+
+
+def stub_chain(token_delay):
+    """Real retrieval over the knowledge base, fake LLM streaming one character per ``token_delay``"""
+    llm = FakeListChatModel(responses=[STUB_ANSWER], sleep=token_delay)
+    # Scratch artifact so the deployed Gemini artifact is left alone
+    with tempfile.TemporaryDirectory() as artifact_dir:
+        return build_qa_chain(embeddings=HashingEmbeddings(), llm=llm, artifact_dir=artifact_dir)
+
+
+def start_server(token_delay, port):
+    app = rag_api.create_app(qa_chain_factory=lambda: stub_chain(token_delay), embeddings_factory=HashingEmbeddings)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def ask(url, question):
+    request = urllib.request.Request(
+        url, data=json.dumps({"question": question}).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request, timeout=300) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def run_wave(url, num_requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = list(executor.map(lambda i: ask(url, QUESTIONS[i % len(QUESTIONS)]), range(num_requests)))
+    return time.perf_counter() - start, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--token-delay", type=float, default=0.01, help="seconds per streamed character")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server = start_server(args.token_delay, args.port)
+    url = f"http://127.0.0.1:{args.port}/assistant/query"
+    ask(url, QUESTIONS[0])
+
+    print(f"{'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'speedup':>8}")
+    baseline = None
+    for concurrency in args.concurrency:
+        num_requests = max(args.requests, concurrency) if concurrency > 1 else min(args.requests, 20)
+        seconds, latencies = run_wave(url, num_requests, concurrency)
+        throughput = num_requests / seconds
+        baseline = baseline or throughput
+        print(f"{concurrency:>8} {throughput:>8.1f} {percentile(latencies, 50):>8.0f} "
+              f"{percentile(latencies, 95):>8.0f} {throughput / baseline:>7.1f}x")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
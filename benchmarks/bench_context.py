@@ -0,0 +1,101 @@
+"""Prompt tokens saved by MMR re-ranking and token-budgeted dynamic k.
+
+Builds a synthetic corpus where each section is split into overlapping
+windows (the near-duplicates produced by ``chunk_overlap`` and repeated
+document versions), embeds it with the offline hashing backend, and compares
+the context a fixed top-k retriever would stuff into the prompt with the
+context chosen by ``context_selection.select_context``. Run from the
+repository root:
+
+    python -m benchmarks.bench_context --sections 200 --queries 200 --k 5 --budget 1000
+"""
+import argparse
+import random
+
+import faiss
+import numpy as np
+
+from context_selection import select_context
+from local_embeddings import HashingEmbeddings
+from token_budget import estimate_tokens
+
+
+def synthetic_sections(num_sections, words_per_section=260, topic_words=40, seed=0):
+    """Sections with their own topic vocabulary plus shared filler words"""
+    rng = random.Random(seed)
+
+    def word():
+        return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9)))
+
+    filler = [word() for _ in range(300)]
+    sections = []
+    for _ in range(num_sections):
+        topic = [word() for _ in range(topic_words)]
+        words = [rng.choice(topic) if rng.random() < 0.5 else rng.choice(filler) for _ in range(words_per_section)]
+        sections.append(" ".join(words))
+    return sections
+
+
+def overlapping_chunks(sections, chunk_size=1000, stride=300):
+    chunks, owners = [], []
+    for owner, text in enumerate(sections):
+        for start in range(0, max(1, len(text) - chunk_size + stride), stride):
+            chunks.append(text[start:start + chunk_size])
+            owners.append(owner)
+    return chunks, owners
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5, help="fixed k of the baseline and upper bound of dynamic k")
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--budget", type=int, default=1000, help="context token budget")
+    parser.add_argument("--mmr-lambda", type=float, default=0.7)
+    args = parser.parse_args()
+
+    sections = synthetic_sections(args.sections)
+    chunks, owners = overlapping_chunks(sections)
+    embeddings = HashingEmbeddings()
+    vectors = np.asarray(embeddings.embed_documents(chunks), dtype=np.float32)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    print(f"{len(chunks)} chunks from {len(sections)} sections "
+          f"(~{np.mean([estimate_tokens(c) for c in chunks]):.0f} tokens each)")
+
+    rng = random.Random(1)
+    targets = [rng.randrange(len(sections)) for _ in range(args.queries)]
+    questions = []
+    for target in targets:
+        words = sections[target].split()
+        start = rng.randrange(len(words) - 12)
+        questions.append(" ".join(words[start:start + 12]))
+    query_vectors = np.asarray(embeddings.embed_documents(questions), dtype=np.float32)
+    _, candidates = index.search(query_vectors, args.candidates)
+
+    rows = {"top-k": [], "mmr + budget": []}
+    for target, query_vector, row in zip(targets, query_vectors, candidates):
+        row = [int(i) for i in row if i != -1]
+        texts = [chunks[i] for i in row]
+        order = select_context(query_vector, vectors[row], texts, args.k, args.mmr_lambda, args.budget)
+        for name, picked in (("top-k", row[:args.k]), ("mmr + budget", [row[i] for i in order])):
+            picked_owners = [owners[i] for i in picked]
+            rows[name].append((
+                sum(estimate_tokens(chunks[i]) for i in picked),
+                len(picked),
+                len(set(picked_owners)),
+                target in picked_owners,
+            ))
+
+    print(f"{'context':>14} {'tokens':>8} {'chunks':>7} {'sections':>9} {'hit rate':>9}")
+    for name, values in rows.items():
+        tokens, count, distinct, hits = map(np.mean, zip(*values))
+        print(f"{name:>14} {tokens:>8.0f} {count:>7.1f} {distinct:>9.1f} {hits:>9.2f}")
+    saved = np.mean([a[0] - b[0] for a, b in zip(rows["top-k"], rows["mmr + budget"])])
+    print(f"prompt tokens saved per query: {saved:.0f} "
+          f"({saved / np.mean([r[0] for r in rows['top-k']]):.0%} of the top-k context)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Query-embedding latency and retrieval quality of the embedding backends.
+
+Uses the Document Assistant knowledge base with one hand-labelled relevant
+document per question. The hashing backend always runs; the sentence-transformers
+backend runs when the package and ``LOCAL_EMBEDDING_MODEL`` are available, and
+the remote Gemini model when ``GOOGLE_API_KEY`` is set. Run from the repository
+root:
+
+    python -m benchmarks.bench_embedding_backends
+"""
+import os
+import time
+
+import numpy as np
+
+from Day_17_RAG_Document_Assitant.knowledge_base import EMBEDDING_MODEL, documents
+from local_embeddings import HashingEmbeddings, sentence_transformer_embeddings
+
+# (question, index of the relevant document in knowledge_base.documents)
+EVAL_SET = [
+    ("What is LangChain used for?", 0),
+    ("How does retrieval augmented generation improve answers?", 1),
+    ("Which library is used for fast vector similarity search?", 2),
+    ("How can I build a data dashboard in Python quickly?", 3),
+    ("What kind of content can generative AI create?", 4),
+    ("What are large language models trained on?", 5),
+    ("What is agentic AI?", 6),
+    ("How do I design better prompts for a model?", 7),
+    ("What is step-by-step reasoning in prompting?", 8),
+    ("Explain RLHF", 9),
+    ("Can models learn a task from only a few examples?", 10),
+    ("Why fine-tune a pretrained model on domain data?", 11),
+    ("How does neural search differ from keyword search?", 12),
+    ("What does AI alignment research focus on?", 13),
+    ("Which architecture relies on self-attention?", 14),
+    ("How can networks keep context over long sequences?", 15),
+    ("What are systems that combine text and images called?", 16),
+    ("What principles guide ethical AI development?", 17),
+    ("What infrastructure does enterprise-scale AI need?", 18),
+    ("How can we make model decisions transparent?", 19),
+]
+
+
+def available_backends():
+    backends = {"hashing": HashingEmbeddings}
+    try:
+        import sentence_transformers  # noqa: F401
+        backends["sentence-transformers"] = sentence_transformer_embeddings
+    except ImportError:
+        pass
+    if os.getenv("GOOGLE_API_KEY"):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+        backends["remote (gemini)"] = lambda: GoogleGenerativeAIEmbeddings(model=EMBEDDING_MODEL)
+    return backends
+
+
+def evaluate(embeddings):
+    doc_vectors = np.asarray(embeddings.embed_documents(documents), dtype=np.float32)
+    doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+
+    latencies, ranks = [], []
+    for question, relevant in EVAL_SET:
+        start = time.perf_counter()
+        query = np.asarray(embeddings.embed_query(question), dtype=np.float32)
+        latencies.append((time.perf_counter() - start) * 1000)
+        scores = doc_vectors @ (query / np.linalg.norm(query))
+        ranks.append(int((scores > scores[relevant]).sum()) + 1)
+
+    ranks = np.asarray(ranks)
+    return {
+        "ms/query p50": float(np.median(latencies)),
+        "recall@1": float((ranks <= 1).mean()),
+        "recall@3": float((ranks <= 3).mean()),
+        "MRR": float((1.0 / ranks).mean()),
+    }
+
+
+def main():
+    print(f"{len(documents)} documents, {len(EVAL_SET)} labelled questions")
+    print(f"{'backend':24} {'ms/query p50':>13} {'recall@1':>9} {'recall@3':>9} {'MRR':>6}")
+    for name, factory in available_backends().items():
+        result = evaluate(factory())
+        print(f"{name:24} {result['ms/query p50']:13.2f} {result['recall@1']:9.2f} "
+              f"{result['recall@3']:9.2f} {result['MRR']:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
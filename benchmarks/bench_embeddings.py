@@ -0,0 +1,55 @@
+"""Compare serial vs. concurrent batch embedding throughput against the stub server.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_embeddings --chunks 2000 --latency 0.2 --failure-rate 0.05
+"""
+import argparse
+import time
+
+from async_embeddings import AsyncBatchEmbeddings, HTTPEmbeddings
+from benchmarks.embedding_stub_server import start_stub_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--requests-per-second", type=float, default=50.0)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--failure-rate", type=float, default=0.05)
+    args = parser.parse_args()
+
+    server = start_stub_server(latency=args.latency, failure_rate=args.failure_rate)
+    url = f"http://127.0.0.1:{server.server_address[1]}/embed"
+    texts = [f"chunk {i} " + "lorem ipsum " * 50 for i in range(args.chunks)]
+
+    # Serial baseline without failures, since it has no retry to survive them
+    baseline_server = start_stub_server(latency=args.latency)
+    baseline = HTTPEmbeddings(f"http://127.0.0.1:{baseline_server.server_address[1]}/embed")
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        baseline.embed_documents(texts[i:i + args.batch_size])
+    serial_seconds = time.perf_counter() - start
+    print(f"serial:     {len(texts) / serial_seconds:8.1f} chunks/s ({serial_seconds:.2f}s)")
+
+    client = AsyncBatchEmbeddings(
+        HTTPEmbeddings(url),
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        requests_per_second=args.requests_per_second,
+        base_delay=0.05,
+    )
+    vectors = client.embed_documents(texts)
+    assert len(vectors) == len(texts)
+    stats = client.last_stats
+    print(f"concurrent: {stats['chunks_per_second']:8.1f} chunks/s ({stats['seconds']:.2f}s, "
+          f"{stats['batches']} batches, failure rate {args.failure_rate:.0%})")
+
+    server.shutdown()
+    baseline_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Added per-query latency and exact-term hit rate of hybrid BM25 + vector retrieval.
+
+Generates a synthetic corpus where every chunk carries one unique product code,
+embeds it with the offline hashing backend, and compares dense-only FAISS
+search with dense + BM25 + reciprocal-rank fusion on questions that name a
+code. Run from the repository root:
+
+    python -m benchmarks.bench_hybrid --docs 5000 --queries 200
+"""
+import argparse
+import random
+import time
+from types import SimpleNamespace
+
+import faiss
+import numpy as np
+
+from hybrid_retrieval import BM25Index, dense_search, reciprocal_rank_fusion
+from local_embeddings import HashingEmbeddings
+
+
+def synthetic_corpus(num_docs, words_per_doc=150, vocab_size=2000, seed=0):
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9))) for _ in range(vocab_size)]
+    docs = []
+    for i in range(num_docs):
+        words = rng.choices(vocab, k=words_per_doc)
+        words.insert(rng.randrange(words_per_doc), f"SKU-{i:05d}")
+        docs.append(" ".join(words))
+    return docs, vocab
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", type=int, default=20)
+    args = parser.parse_args()
+
+    docs, vocab = synthetic_corpus(args.docs)
+    embeddings = HashingEmbeddings()
+    vectors = np.asarray(embeddings.embed_documents(docs), dtype=np.float32)
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    store = SimpleNamespace(index=index, index_to_docstore_id={i: i for i in range(len(docs))})
+
+    start = time.perf_counter()
+    bm25 = BM25Index()
+    bm25.add(range(len(docs)), docs)
+    print(f"{len(docs)} chunks; BM25 index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    rng = random.Random(1)
+    targets = rng.sample(range(len(docs)), args.queries)
+    questions = [f"what is the {rng.choice(vocab)} policy for SKU-{t:05d}" for t in targets]
+    query_vectors = [embeddings.embed_query(q) for q in questions]
+
+    dense_ms, hybrid_ms, dense_hits, hybrid_hits = [], [], 0, 0
+    for target, question, vector in zip(targets, questions, query_vectors):
+        start = time.perf_counter()
+        dense_ids = dense_search(store, vector, args.k)
+        dense_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        candidates = dense_search(store, vector, args.candidates)
+        hybrid_ids = reciprocal_rank_fusion([candidates, bm25.search(question, args.candidates)], args.k)
+        hybrid_ms.append((time.perf_counter() - start) * 1000)
+
+        dense_hits += target in dense_ids
+        hybrid_hits += target in hybrid_ids
+
+    for name, ms, hits in (("dense", dense_ms, dense_hits), ("hybrid", hybrid_ms, hybrid_hits)):
+        print(f"{name:7} p50 {np.percentile(ms, 50):6.2f} ms  p95 {np.percentile(ms, 95):6.2f} ms  "
+              f"exact-term hit@{args.k} {hits / len(targets):.2f}")
+    print(f"added latency p50: {np.percentile(hybrid_ms, 50) - np.percentile(dense_ms, 50):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Recall@k vs. latency vs. memory of the compressed index backends.
+
+Builds each backend on the same synthetic clustered vectors (or on vectors
+loaded from a ``.npy`` file, e.g. real chunk embeddings) and compares it with
+the exact flat index. Run from the repository root:
+
+    python -m benchmarks.bench_index --vectors 50000 --dim 768 --k 5
+"""
+import argparse
+import time
+
+import numpy as np
+
+from index_backends import BACKENDS, build_index, index_memory_bytes
+
+
+def synthetic_vectors(num_vectors, dim, latent_dim=48, clusters=200, seed=0):
+    """Clustered vectors on a low-dimensional subspace, like real text embeddings"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, latent_dim))
+    labels = rng.integers(0, clusters, size=num_vectors)
+    latent = centers[labels] + 0.5 * rng.normal(size=(num_vectors, latent_dim))
+    projection = rng.normal(size=(latent_dim, dim)) / np.sqrt(latent_dim)
+    noise = 0.05 * rng.normal(size=(num_vectors, dim))
+    return (latent @ projection + noise).astype(np.float32)
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vectors", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nprobe", type=int, default=None)
+    parser.add_argument("--npy", help="load vectors from this .npy file instead of generating them")
+    args = parser.parse_args()
+
+    if args.npy:
+        vectors = np.load(args.npy).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, args.dim)
+    queries, vectors = vectors[:args.queries], vectors[args.queries:]
+
+    truth = None
+    print(f"{len(vectors)} vectors, dim {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+    print(f"{'backend':8} {'build s':>8} {'memory MB':>10} {'ms/query':>9} {'recall@k':>9}")
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        index = build_index(vectors, backend, nprobe=args.nprobe)
+        build_seconds = time.perf_counter() - start
+
+        # One query at a time, as the chat apps search
+        start = time.perf_counter()
+        found = np.vstack([index.search(q[None, :], args.k)[1] for q in queries])
+        ms_per_query = (time.perf_counter() - start) * 1000 / len(queries)
+
+        if truth is None:
+            truth = found
+        print(f"{backend:8} {build_seconds:8.2f} {index_memory_bytes(index) / 2**20:10.1f} "
+              f"{ms_per_query:9.3f} {recall_at_k(found, truth):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
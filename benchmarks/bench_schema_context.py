@@ -0,0 +1,111 @@
+"""Prompt size of the Data Analysis Agent's dataset context, before and after budgeting.
+
+Builds a synthetic sales-like table of configurable width and compares, for
+each Gemini entry point, the dataset context the agent used to paste into the
+prompt (``df.info()`` + ``describe()`` + dtypes + missing counts, or raw
+``df.head()`` dumps) with the token-budgeted ``build_schema_context`` output it
+now gets: the full context for analysis and recommendations, the short-lines
+context for visualization and column analysis.
+Gemini latency grows with prompt length, so fewer prompt tokens is what the
+per-call latency panel in the app should reflect. Run from the repository root:
+
+    python -m benchmarks.bench_schema_context --rows 100000 --columns 60 --budget 800 --short-budget 150
+"""
+import argparse
+import io
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "Day_18_AI-Agent_Data_Analyst Agent"))
+from data_profile import profile_dataframe
+from schema_context import SCHEMA_SHORT_TOKEN_BUDGET, SCHEMA_TOKEN_BUDGET, build_schema_context
+from token_budget import estimate_tokens
+
+
+def synthetic_table(rows, columns, seed=0):
+    """Numeric measures, low-cardinality categories, dates and an ID column"""
+    rng = np.random.default_rng(seed)
+    data = {
+        "TransactionID": [f"TRX-{i:07d}" for i in range(rows)],
+        "TransactionDate": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+    }
+    for i in range(columns - len(data)):
+        if i % 3 == 2:
+            data[f"Segment{i}"] = pd.Categorical(rng.choice([f"Group {j}" for j in range(8)], rows))
+        else:
+            values = rng.gamma(2.0, 50.0, rows).round(2)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[f"Measure{i}"] = values
+    return pd.DataFrame(data)
+
+
+def old_description(df):
+    """The agent's former get_data_description"""
+    buffer = io.StringIO()
+    df.info(buf=buffer)
+    return (f"Shape: {df.shape[0]} rows x {df.shape[1]} columns\n\nColumn Information:\n{df.dtypes.to_string()}"
+            f"\n\nMissing Values:\n{df.isnull().sum().to_string()}\n\nSummary Statistics:\n"
+            f"{df.describe().to_string()}\n\nInfo:\n{buffer.getvalue()}")
+
+
+def old_contexts(df):
+    return {
+        "analysis": old_description(df),
+        "visualization": f"Dataset columns: {', '.join(df.columns.tolist())}\nSample data: {df.head(3).to_string()}",
+        "recommendations": (f"Column Information:\n{df.dtypes.to_string()}\n\nData Sample:\n{df.head(5).to_string()}"
+                            f"\n\nMissing Values:\n{df.isnull().sum().to_string()}"),
+        "column_analysis": f"{df.dtypes.to_string()}\n{df.head(3).to_string()}",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--columns", type=int, default=60)
+    parser.add_argument("--budget", type=int, default=SCHEMA_TOKEN_BUDGET, help="schema context token budget")
+    parser.add_argument("--short-budget", type=int, default=SCHEMA_SHORT_TOKEN_BUDGET,
+                        help="token budget of the short-lines context")
+    args = parser.parse_args()
+
+    df = synthetic_table(args.rows, args.columns)
+
+    start = time.perf_counter()
+    before = old_contexts(df)
+    before_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    profile = profile_dataframe(df)
+    profile_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    context = build_schema_context(profile, args.budget)
+    short_context = build_schema_context(profile, args.short_budget, detailed=False)
+    context_ms = (time.perf_counter() - start) * 1000
+    after = {
+        "analysis": context,
+        "visualization": short_context,
+        "recommendations": context,
+        "column_analysis": short_context,
+    }
+
+    print(f"{args.rows:,} rows x {args.columns} columns, budget {args.budget} tokens "
+          f"({args.short_budget} short)")
+    print(f"{'entry point':>16} {'before':>8} {'after':>7} {'saved':>6}")
+    for name, text in before.items():
+        old, new = estimate_tokens(text), estimate_tokens(after[name])
+        print(f"{name:>16} {old:>8} {new:>7} {1 - new / old:>6.0%}")
+    print(f"context build: {before_ms:.0f} ms before (every call), "
+          f"profile {profile_ms:.0f} ms once per file + {context_ms:.1f} ms after")
+    for label, text in (("context", context), ("short context", short_context)):
+        named = set(re.split(r"[\s,():]+", text))
+        missing = [column for column in df.columns if column not in named]
+        print(f"columns named in the {label}: {len(df.columns) - len(missing)}/{len(df.columns)}")
+
+
+if __name__ == "__main__":
+    main()
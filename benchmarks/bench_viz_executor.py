@@ -0,0 +1,93 @@
+"""Throughput and isolation of the Data Analysis Agent's visualization executor.
+
+Renders the same generated Plotly code from many concurrent "sessions", once
+with the old in-process ``exec`` (all sessions share the server's GIL) and
+once through ``VisualizationExecutor``'s pre-warmed worker processes, then
+submits a runaway loop to show it is stopped at the timeout while other jobs
+keep completing. Run from the repository root:
+
+    python -m benchmarks.bench_viz_executor --rows 500000 --jobs 16 --workers 4
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             "Day_18_AI-Agent_Data_Analyst Agent"))
+from viz_executor import VisualizationExecutor, VizError
+
+CODE = """
+daily = df.groupby([df['TransactionDate'].dt.month, 'StoreLocation'], observed=True)['TotalSale'].sum().reset_index()
+fig = px.line(daily, x='TransactionDate', y='TotalSale', color='StoreLocation')
+"""
+
+
+def sales_table(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "TransactionDate": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "StoreLocation": pd.Categorical(rng.choice(["Chicago", "Miami", "New York", "Los Angeles", "Seattle"], rows)),
+        "TotalSale": rng.gamma(2.0, 150.0, rows).round(2),
+    })
+
+
+def in_process(df):
+    local_vars = {"df": df, "px": px, "pd": pd, "np": np}
+    exec(CODE, globals(), local_vars)
+    return local_vars["fig"].to_json()
+
+
+def timed(fn, jobs, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: fn(), range(jobs)))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    df = sales_table(args.rows)
+    in_process(df)  # warm the plotting imports, as a running server would have
+    seconds = timed(lambda: in_process(df), args.jobs, args.workers)
+    print(f"in-process exec: {args.jobs} jobs in {seconds:.2f}s ({args.jobs / seconds:.1f} figures/s)")
+
+    executor = VisualizationExecutor(workers=args.workers, timeout=args.timeout)
+    try:
+        start = time.perf_counter()
+        # One job per worker so every worker has loaded the shared frame
+        timed(lambda: executor.run(CODE, "bench", df), args.workers, args.workers)
+        print(f"pool warm-up (imports + first data load): {time.perf_counter() - start:.2f}s")
+        seconds = timed(lambda: executor.run(CODE, "bench", df), args.jobs, args.workers)
+        print(f"worker pool:     {args.jobs} jobs in {seconds:.2f}s ({args.jobs / seconds:.1f} figures/s)")
+
+        def runaway():
+            try:
+                executor.run("while True:\n    pass", "bench", df)
+            except VizError as e:
+                return str(e)
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            stuck = pool.submit(runaway)
+            start = time.perf_counter()
+            timed(lambda: executor.run(CODE, "bench", df), args.jobs, args.workers - 1)
+            others = time.perf_counter() - start
+            print(f"with a runaway job: other {args.jobs} jobs took {others:.2f}s; runaway -> {stuck.result()!r}")
+        print(f"executor stats: {executor.stats()}")
+    finally:
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
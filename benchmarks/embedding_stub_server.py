@@ -0,0 +1,70 @@
+"""Local stand-in for a remote embedding API.
+
+Serves ``POST /embed`` with ``{"texts": [...]}`` and answers with deterministic
+pseudo-random vectors after a configurable delay, failing a configurable
+fraction of requests with HTTP 503 so retry behaviour can be exercised.
+
+Run from the repository root:
+
+    python -m benchmarks.embedding_stub_server --port 8765 --latency 0.2 --failure-rate 0.1
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def fake_vector(text, dim):
+    """Deterministic unit-scale vector for a text"""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    return [rng.uniform(-1, 1) for _ in range(dim)]
+
+
+def make_handler(latency, failure_rate, dim):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            texts = json.loads(self.rfile.read(length))["texts"]
+            time.sleep(latency)
+            if random.random() < failure_rate:
+                self.send_response(503)
+                self.end_headers()
+                return
+            body = json.dumps({"embeddings": [fake_vector(t, dim) for t in texts]}).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def start_stub_server(port=0, latency=0.2, failure_rate=0.0, dim=768):
+    """Start the stub server on a background thread and return it"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(latency, failure_rate, dim))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per request")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--dim", type=int, default=768)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, args.failure_rate, args.dim)
+    print(f"Stub embedding server listening on http://127.0.0.1:{server.server_address[1]}/embed")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,98 @@
+"""Token-budgeted conversation memory with a rolling summary.
+
+``RollingSummaryMemory`` keeps the most recent turns verbatim and folds older
+ones into a running summary, so the history sent with every question stays
+roughly constant in size however long the session runs. The summary is updated
+on a background thread after a turn is saved, keeping the extra LLM call off
+the answer's critical path; until it lands, the older turns simply stay in the
+verbatim buffer.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.memory.summary import SummarizerMixin
+from langchain.schema import SystemMessage
+
+from token_budget import estimate_message_tokens
+
+# Shared by every session; summaries are small, infrequent calls
+_summary_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="memory-summary")
+
+
+class RollingSummaryMemory(BaseChatMemory, SummarizerMixin):
+    """Last ``max_turns`` turns verbatim plus a summary of everything older"""
+
+    memory_key: str = "chat_history"
+    max_turns: int = 4
+    max_token_limit: int = 1500
+    moving_summary_buffer: str = ""
+    pending_summary: Any = None
+    # Bumped by clear(); summaries started before a clear are discarded
+    generation: int = 0
+    lock: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.lock = threading.Lock()
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self.lock:
+            messages = list(self.chat_memory.messages)
+            summary = self.moving_summary_buffer
+        if summary:
+            messages = [SystemMessage(content=f"Summary of the earlier conversation: {summary}")] + messages
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: "\n".join(f"{m.type}: {m.content}" for m in messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        with self.lock:
+            super().save_context(inputs, outputs)
+            self._schedule_summary()
+
+    def _schedule_summary(self):
+        # One summary update at a time; a later turn picks up whatever is left
+        if self.pending_summary is not None and not self.pending_summary.done():
+            return
+        messages = self.chat_memory.messages
+        overflow = max(0, len(messages) - 2 * self.max_turns)
+        while (overflow < len(messages) - 2
+               and estimate_message_tokens(messages[overflow:]) > self.max_token_limit):
+            overflow += 2
+        if overflow:
+            self.pending_summary = _summary_executor.submit(
+                self._fold_into_summary, list(messages[:overflow]), self.moving_summary_buffer, self.generation
+            )
+
+    def _fold_into_summary(self, old_messages, existing_summary, generation):
+        summary = self.predict_new_summary(old_messages, existing_summary)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.moving_summary_buffer = summary
+            # Drop exactly the summarized messages (by identity), even if new turns arrived meanwhile
+            summarized = {id(message) for message in old_messages}
+            self.chat_memory.messages = [m for m in self.chat_memory.messages if id(m) not in summarized]
+
+    def clear(self) -> None:
+        with self.lock:
+            super().clear()
+            self.moving_summary_buffer = ""
+            self.generation += 1
+            if self.pending_summary is not None:
+                self.pending_summary.cancel()
+                self.pending_summary = None
+
+    def prompt_metrics(self):
+        """Size of the history this memory currently contributes to a prompt"""
+        messages = self.load_memory_variables({})[self.memory_key]
+        return {
+            "history_messages": len(messages),
+            "history_tokens": estimate_message_tokens(messages) if self.return_messages else 0,
+        }
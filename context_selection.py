@@ -0,0 +1,80 @@
+"""Retrieval post-processing: MMR re-ranking and token-budgeted dynamic k.
+
+Overlapping chunks (``chunk_overlap``) and repeated boilerplate put
+near-duplicate text into the prompt, paying LLM input tokens and latency for
+context the model has already seen. After retrieval the candidate set is:
+
+1. re-ranked by Maximal Marginal Relevance, computed in NumPy over the
+   candidate embedding matrix, so each pick balances relevance to the query
+   against similarity to the chunks already chosen
+2. cut off once the chosen chunks fill ``token_budget`` estimated tokens,
+   so k follows chunk sizes instead of being fixed
+
+``benchmarks/bench_context.py`` reports prompt tokens saved per query.
+"""
+import os
+import weakref
+
+import numpy as np
+
+from token_budget import count_within_budget
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# vectorstore -> (index size, docstore id -> FAISS position)
+_positions = weakref.WeakKeyDictionary()
+
+
+def _unit_rows(matrix):
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms > 0, norms, 1)
+
+
+def mmr(query_vector, candidate_vectors, k, lambda_mult=MMR_LAMBDA):
+    """Indices of up to ``k`` candidates in Maximal Marginal Relevance order (cosine similarity)"""
+    candidates = _unit_rows(candidate_vectors)
+    if len(candidates) == 0:
+        return []
+    relevance = candidates @ _unit_rows(query_vector)
+    similarity = candidates @ candidates.T
+    # Highest similarity of each candidate to anything already selected
+    redundancy = np.zeros(len(candidates), dtype=np.float32)
+    available = np.ones(len(candidates), dtype=bool)
+    selected = []
+    for _ in range(min(k, len(candidates))):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return selected
+
+
+def select_context(query_vector, candidate_vectors, texts, max_k, lambda_mult=MMR_LAMBDA,
+                   token_budget=CONTEXT_TOKEN_BUDGET):
+    """Indices of the candidates to put in the prompt, most useful first.
+
+    ``lambda_mult=None`` keeps the retrieval order; ``token_budget=None``
+    always returns ``max_k`` candidates.
+    """
+    if lambda_mult is None:
+        order = list(range(min(max_k, len(texts))))
+    else:
+        order = mmr(query_vector, candidate_vectors, max_k, lambda_mult)
+    if token_budget is not None:
+        order = order[:count_within_budget([texts[i] for i in order], token_budget)]
+    return order
+
+
+def stored_vectors(vectorstore, doc_ids):
+    """Embedding rows of the given docstore ids, reconstructed from the FAISS index"""
+    index = vectorstore.index
+    cached = _positions.get(vectorstore)
+    if cached is None or cached[0] != index.ntotal:
+        cached = (index.ntotal, {doc_id: position for position, doc_id in vectorstore.index_to_docstore_id.items()})
+        _positions[vectorstore] = cached
+    positions = cached[1]
+    return np.vstack([index.reconstruct(int(positions[doc_id])) for doc_id in doc_ids])
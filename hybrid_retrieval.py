@@ -0,0 +1,175 @@
+"""Hybrid BM25 + vector retrieval with reciprocal-rank fusion.
+
+Dense retrieval misses exact-term questions (product codes, acronyms such as
+"RLHF") whose embeddings land near unrelated text. ``BM25Index`` is a compact
+in-memory inverted index whose postings are typed arrays, updated incrementally
+as documents are added; ``HybridRetriever`` fuses its ranking with the FAISS
+ranking by reciprocal rank, so a chunk ranked highly by either side makes the
+context. Documents are identified by their FAISS docstore ids, which stay stable
+when per-document stores are merged or compressed. With ``mmr_lambda`` or
+``token_budget`` set, the fused candidates are narrowed by MMR and a token
+budget (see ``context_selection.py``) instead of a fixed top k.
+"""
+import math
+import re
+from array import array
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain.schema import BaseRetriever, Document
+
+from context_selection import select_context, stored_vectors
+
+# Keeps codes like "trx-10000", "gpt-4" or "v1.2" as single terms
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_.][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how in is it of on or that the "
+    "this to was what when where which who why will with".split()
+)
+
+
+def tokenize(text):
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """Incrementally updatable BM25 index over document ids"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = []
+        self._positions = {}
+        self._doc_lengths = array("i")
+        # term -> (document positions, term frequencies)
+        self._postings = {}
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def add(self, doc_ids, texts):
+        """Index new documents; ids already present are skipped"""
+        for doc_id, text in zip(doc_ids, texts):
+            if doc_id in self._positions:
+                continue
+            position = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self._positions[doc_id] = position
+            tokens = tokenize(text)
+            self._doc_lengths.append(len(tokens))
+
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, count in counts.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = (array("i"), array("f"))
+                postings[0].append(position)
+                postings[1].append(count)
+
+    def add_vectorstore(self, vectorstore):
+        """Index every chunk of a LangChain FAISS store by its docstore id"""
+        doc_ids = list(vectorstore.index_to_docstore_id.values())
+        new_ids = [doc_id for doc_id in doc_ids if doc_id not in self._positions]
+        texts = [vectorstore.docstore.search(doc_id).page_content for doc_id in new_ids]
+        self.add(new_ids, texts)
+
+    def search(self, query, k=10):
+        """Return up to ``k`` document ids ranked by BM25 score"""
+        num_docs = len(self.doc_ids)
+        if num_docs == 0:
+            return []
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32)
+        avg_length = max(doc_lengths.mean(), 1.0)
+        scores = np.zeros(num_docs, dtype=np.float32)
+
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            positions = np.frombuffer(postings[0], dtype=np.int32)
+            tf = np.frombuffer(postings[1], dtype=np.float32)
+            idf = math.log(1 + (num_docs - len(positions) + 0.5) / (len(positions) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * doc_lengths[positions] / avg_length)
+            # Each document appears at most once per term, so plain indexing is safe
+            scores[positions] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        matched = np.flatnonzero(scores)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k)[:k]]
+        ranked = matched[np.argsort(-scores[matched], kind="stable")]
+        return [self.doc_ids[i] for i in ranked]
+
+
+def dense_search(vectorstore, query_vector, k):
+    """Docstore ids of the ``k`` nearest chunks in a LangChain FAISS store"""
+    return dense_search_batch(vectorstore, [query_vector], k)[0]
+
+
+def dense_search_batch(vectorstore, query_vectors, k):
+    """``dense_search`` for many queries with a single matrix search"""
+    matrix = np.asarray(query_vectors, dtype=np.float32)
+    _, positions = vectorstore.index.search(matrix, k)
+    return [[vectorstore.index_to_docstore_id[int(i)] for i in row if i != -1] for row in positions]
+
+
+def reciprocal_rank_fusion(rankings, k, rrf_k=60):
+    """Merge several ranked id lists; each contributes 1 / (rrf_k + rank)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores, key=scores.get, reverse=True)[:k]
+
+
+def lookup_documents(vectorstore, doc_ids):
+    return [vectorstore.docstore.search(doc_id) for doc_id in doc_ids]
+
+
+def embed_query_fn(vectorstore):
+    """Query-embedding callable of a LangChain FAISS store (older versions store the function itself)"""
+    embedding_function = vectorstore.embedding_function
+    return getattr(embedding_function, "embed_query", embedding_function)
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse FAISS and BM25 rankings with reciprocal-rank fusion"""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 5
+    candidate_k: int = 20
+    rrf_k: int = 60
+    # Context selection over the fused candidates; ``k`` becomes the upper bound
+    mmr_lambda: Optional[float] = None
+    token_budget: Optional[int] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    @property
+    def fused_k(self):
+        """How many fused candidates to keep before context selection"""
+        if self.mmr_lambda is None and self.token_budget is None:
+            return self.k
+        return max(self.k, self.candidate_k)
+
+    def select_documents(self, query_vector, doc_ids):
+        """Final context for fused candidate ids, in prompt order"""
+        docs = lookup_documents(self.vectorstore, doc_ids)
+        if self.mmr_lambda is None and self.token_budget is None:
+            return docs[:self.k]
+        vectors = stored_vectors(self.vectorstore, doc_ids) if self.mmr_lambda is not None else None
+        order = select_context(query_vector, vectors, [doc.page_content for doc in docs], self.k,
+                               self.mmr_lambda, self.token_budget)
+        return [docs[i] for i in order]
+
+    def search_by_vector(self, query, query_vector):
+        dense_ids = dense_search(self.vectorstore, query_vector, self.candidate_k)
+        sparse_ids = self.bm25.search(query, self.candidate_k)
+        fused = reciprocal_rank_fusion([dense_ids, sparse_ids], self.fused_k, self.rrf_k)
+        return self.select_documents(query_vector, fused)
+
+    def _get_relevant_documents(self, query, *, run_manager=None) -> List[Document]:
+        return self.search_by_vector(query, embed_query_fn(self.vectorstore)(query))
@@ -0,0 +1,101 @@
+"""Compressed FAISS index backends for large document collections.
+
+A flat index stores every vector in full and scans all of them per query, so
+memory and search time grow linearly with the collection. Once a session's
+chunk count crosses ``COMPRESS_THRESHOLD`` the combined store is rebuilt on a
+compressed index trained on the accumulated vectors:
+
+- ``sq8``:    scalar int8 quantization, 4x smaller, still an exhaustive scan
+- ``ivfsq8``: inverted lists + int8 codes, 4x smaller and probes only ``nprobe``
+              of the lists per query (the "auto" choice)
+- ``ivfpq``:  inverted lists + product quantization, ~30x smaller at a
+              noticeable recall cost and a slower training step
+
+``benchmarks/bench_index.py`` compares recall@k, latency and memory of each
+backend against the flat index.
+"""
+import math
+import os
+
+import faiss
+import numpy as np
+from langchain.vectorstores import FAISS
+
+INDEX_BACKEND = os.getenv("INDEX_BACKEND", "auto")
+COMPRESS_THRESHOLD = int(os.getenv("INDEX_COMPRESS_THRESHOLD", "20000"))
+BACKENDS = ("flat", "sq8", "ivfsq8", "ivfpq")
+
+
+def _pq_subquantizers(dim, bytes_per_vector):
+    # PQ needs the dimension to split evenly across sub-quantizers
+    m = min(dim, bytes_per_vector)
+    while dim % m:
+        m -= 1
+    return m
+
+
+def index_factory_string(backend, num_vectors, dim, pq_bytes=None):
+    """FAISS index_factory description for a backend sized to the collection"""
+    # ~4 * sqrt(n) lists, capped so each list keeps enough training points
+    nlist = max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+    if backend == "flat":
+        return "Flat"
+    if backend == "sq8":
+        return "SQ8"
+    if backend == "ivfsq8":
+        return f"IVF{nlist},SQ8"
+    if backend == "ivfpq":
+        m = _pq_subquantizers(dim, pq_bytes or max(8, dim // 8))
+        return f"IVF{nlist},PQ{m}x8"
+    raise ValueError(f"Unknown index backend {backend!r}; expected one of {BACKENDS}")
+
+
+def build_index(vectors, backend, metric=faiss.METRIC_L2, nprobe=None, pq_bytes=None):
+    """Train and fill an index of the given backend on ``vectors`` (float32, n x d)"""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    num_vectors, dim = vectors.shape
+    index = faiss.index_factory(dim, index_factory_string(backend, num_vectors, dim, pq_bytes), metric)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add(vectors)
+
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = nprobe or max(8, ivf.nlist // 16)
+        # Allow reconstruct(), which LangChain's MMR search relies on
+        ivf.make_direct_map()
+    return index
+
+
+def choose_backend(num_vectors, backend=INDEX_BACKEND, threshold=COMPRESS_THRESHOLD):
+    """Resolve "auto" to flat below the threshold and ivfsq8 above it"""
+    if backend != "auto":
+        return backend
+    return "ivfsq8" if num_vectors >= threshold else "flat"
+
+
+def _is_flat(index):
+    # Sharded multi-document views (index_store.ShardedIndex) are flat if every shard is
+    return all(isinstance(shard, faiss.IndexFlat) for shard in getattr(index, "shards", [index]))
+
+
+def compress_store(store, backend=INDEX_BACKEND, threshold=COMPRESS_THRESHOLD):
+    """Return ``store`` rebuilt on a compressed index, or unchanged if it is small or already compressed"""
+    index = store.index
+    backend = choose_backend(index.ntotal, backend, threshold)
+    if backend == "flat" or index.ntotal < threshold or not _is_flat(index):
+        return store
+
+    vectors = index.reconstruct_n(0, index.ntotal)
+    compressed = build_index(vectors, backend, metric=index.metric_type)
+    return FAISS(
+        embedding_function=store.embedding_function,
+        index=compressed,
+        docstore=store.docstore,
+        index_to_docstore_id=store.index_to_docstore_id,
+    )
+
+
+def index_memory_bytes(index):
+    """Serialized size of an index, a close proxy for its resident memory"""
+    return sum(faiss.serialize_index(shard).nbytes for shard in getattr(index, "shards", [index]))
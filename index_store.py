@@ -0,0 +1,162 @@
+"""On-disk store of per-document FAISS indexes.
+
+Each processed PDF is written once under its own directory (keyed by a hash of
+the file bytes and the embedding model), so restarts, new browser sessions and
+other worker processes load it from disk instead of re-embedding it. Indexes are
+memory-mapped read-only where the FAISS build supports it, which lets every
+process on the machine share a single copy through the page cache. A session
+with several documents searches their memory-mapped indexes side by side
+(``ShardedIndex``) rather than merging them into a private copy.
+"""
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+
+import faiss
+import numpy as np
+from langchain.docstore.in_memory import InMemoryDocstore
+from langchain.vectorstores import FAISS
+
+DEFAULT_INDEX_DIR = os.getenv("INDEX_STORE_PATH", os.path.join(".cache", "indexes"))
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+META_FILE = "meta.json"
+
+
+def document_id(file_bytes, model_name):
+    """Stable identifier for a document embedded with a given model"""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(file_bytes)
+    return digest.hexdigest()[:32]
+
+
+def _read_index(path):
+    # Memory-map when the index type supports it; otherwise read it normally
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    except RuntimeError:
+        return faiss.read_index(path)
+
+
+class ShardedIndex:
+    """Read-only view that searches several per-document indexes as one, without copying them.
+
+    Positions run through the shards in order, as if they had been merged;
+    searches fan out over the shards on FAISS threads and merge the top k.
+    """
+
+    def __init__(self, shards):
+        self.shards = list(shards)
+        self.d = self.shards[0].d
+        self.metric_type = self.shards[0].metric_type
+        self.offsets = np.cumsum([0] + [shard.ntotal for shard in self.shards])
+        self.ntotal = int(self.offsets[-1])
+        self.is_trained = True
+        self._search = faiss.IndexShards(self.d, True, True)
+        for shard in self.shards:
+            self._search.add_shard(shard)
+
+    def search(self, x, k):
+        return self._search.search(x, k)
+
+    def reconstruct(self, position):
+        shard = int(np.searchsorted(self.offsets, position, side="right")) - 1
+        return self.shards[shard].reconstruct(int(position - self.offsets[shard]))
+
+    def reconstruct_n(self, start, count):
+        vectors = np.vstack([shard.reconstruct_n(0, shard.ntotal) for shard in self.shards])
+        return vectors[start:start + count]
+
+
+class IndexStore:
+    """Persist and lazily load FAISS vector stores, one per document"""
+
+    def __init__(self, root=DEFAULT_INDEX_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._loaded = {}
+        self._lock = threading.Lock()
+
+    def _doc_dir(self, doc_id):
+        return os.path.join(self.root, doc_id)
+
+    def has(self, doc_id):
+        return os.path.exists(os.path.join(self._doc_dir(doc_id), META_FILE))
+
+    def save(self, doc_id, vectorstore, name):
+        """Write a document's index and docstore to disk (no-op if already stored)"""
+        if self.has(doc_id):
+            return
+        # Build in a scratch directory and rename it into place so concurrent
+        # workers never see a half-written index
+        tmp_dir = tempfile.mkdtemp(prefix=f".{doc_id}-", dir=self.root)
+        try:
+            faiss.write_index(vectorstore.index, os.path.join(tmp_dir, INDEX_FILE))
+            with open(os.path.join(tmp_dir, DOCSTORE_FILE), "wb") as f:
+                pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+            with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+                json.dump({"name": name, "chunks": vectorstore.index.ntotal, "created": time.time()}, f)
+            os.replace(tmp_dir, self._doc_dir(doc_id))
+        except OSError:
+            # Another worker stored the same document first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not self.has(doc_id):
+                raise
+
+    def list_documents(self):
+        """Return {doc_id: metadata} for every stored document"""
+        documents = {}
+        for doc_id in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self._doc_dir(doc_id), META_FILE)
+            if doc_id.startswith(".") or not os.path.exists(meta_path):
+                continue
+            with open(meta_path) as f:
+                documents[doc_id] = json.load(f)
+        return documents
+
+    def load(self, doc_id, embeddings):
+        """Load one document's vector store; the result is shared and must not be mutated"""
+        with self._lock:
+            if doc_id not in self._loaded:
+                doc_dir = self._doc_dir(doc_id)
+                index = _read_index(os.path.join(doc_dir, INDEX_FILE))
+                with open(os.path.join(doc_dir, DOCSTORE_FILE), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                self._loaded[doc_id] = FAISS(
+                    embedding_function=embeddings,
+                    index=index,
+                    docstore=docstore,
+                    index_to_docstore_id=index_to_docstore_id,
+                )
+            return self._loaded[doc_id]
+
+    def load_combined(self, doc_ids, embeddings):
+        """Return a read-only vector store covering several stored documents"""
+        if not doc_ids:
+            return None
+        if len(doc_ids) == 1:
+            return self.load(doc_ids[0], embeddings)
+
+        # The per-document indexes stay memory-mapped and shared; only the
+        # (small) position -> docstore id map and docstore view are per session
+        stores = [self.load(doc_id, embeddings) for doc_id in doc_ids]
+        documents, index_to_docstore_id, offset = {}, {}, 0
+        for store in stores:
+            documents.update(store.docstore._dict)
+            for position, docstore_id in store.index_to_docstore_id.items():
+                index_to_docstore_id[offset + position] = docstore_id
+            offset += store.index.ntotal
+        return FAISS(
+            embedding_function=embeddings,
+            index=ShardedIndex(store.index for store in stores),
+            docstore=InMemoryDocstore(documents),
+            index_to_docstore_id=index_to_docstore_id,
+        )
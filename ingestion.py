@@ -0,0 +1,157 @@
+"""Batch ingestion of uploaded PDFs.
+
+Each file is parsed straight from its uploaded bytes in a worker process, one
+page at a time. Pages are split as they arrive and handed back in fixed-size
+chunk batches through a bounded queue, and a thread in the server embeds each
+batch and appends it to the file's FAISS store. Peak memory per file is a few
+batches of chunks rather than the whole document, and several files stream
+through the process pool at once.
+"""
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from langchain.docstore.document import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.vectorstores import FAISS
+from pypdf import PdfReader
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 100
+BATCH_SIZE = 64
+# Batches a parser may run ahead of the embedder before it blocks
+QUEUE_DEPTH = 2
+
+
+def create_parse_pool(max_workers=None):
+    """Process pool for PDF parsing; spawned workers avoid forking the server's threads"""
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def iter_pdf_pages(name, file_bytes):
+    """Yield one Document per PDF page, read directly from the uploaded bytes"""
+    reader = PdfReader(io.BytesIO(file_bytes))
+    for page_number, page in enumerate(reader.pages):
+        yield Document(
+            page_content=page.extract_text() or "",
+            metadata={"source": name, "page": page_number},
+        )
+
+
+def iter_chunk_batches(name, file_bytes, batch_size=BATCH_SIZE,
+                       chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP):
+    """Split pages as they are read and yield lists of at most ``batch_size`` chunks"""
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    batch = []
+    for page in iter_pdf_pages(name, file_bytes):
+        batch.extend(text_splitter.split_documents([page]))
+        while len(batch) >= batch_size:
+            yield batch[:batch_size]
+            batch = batch[batch_size:]
+    if batch:
+        yield batch
+
+
+def stream_pdf_chunks(name, file_bytes, queue, batch_size=BATCH_SIZE):
+    """Worker-process entry point: push chunk batches to ``queue``, then ``None``"""
+    try:
+        for batch in iter_chunk_batches(name, file_bytes, batch_size):
+            # Blocks while the embedder is QUEUE_DEPTH batches behind
+            queue.put(batch)
+    except Exception as e:
+        queue.put(e)
+        return
+    queue.put(None)
+
+
+def build_store_from_batches(batches, embeddings):
+    """Embed chunk batches one at a time and add them to a FAISS store"""
+    store = None
+    for batch in batches:
+        texts = [chunk.page_content for chunk in batch]
+        pairs = list(zip(texts, embeddings.embed_documents(texts)))
+        metadatas = [chunk.metadata for chunk in batch]
+        if store is None:
+            store = FAISS.from_embeddings(pairs, embeddings, metadatas=metadatas)
+        else:
+            store.add_embeddings(pairs, metadatas=metadatas)
+    if store is None:
+        raise ValueError("no extractable text found")
+    return store
+
+
+def _drain(queue):
+    finished = False
+    try:
+        while True:
+            item = queue.get()
+            if item is None or isinstance(item, Exception):
+                finished = True
+                if item is None:
+                    return
+                raise item
+            yield item
+    finally:
+        # Keep reading so an abandoned parser is not left blocked on a full queue
+        while not finished:
+            item = queue.get()
+            finished = item is None or isinstance(item, Exception)
+
+
+def _consume(queue, embeddings):
+    batches = _drain(queue)
+    try:
+        return build_store_from_batches(batches, embeddings)
+    finally:
+        batches.close()
+
+
+def ingest_files(files, embeddings, parse_pool, on_progress=None, batch_size=BATCH_SIZE):
+    """Stream several PDFs through parsing, chunking and embedding concurrently.
+
+    ``files`` is a list of ``(name, file_bytes)`` pairs. ``on_progress`` is called
+    from the calling thread as ``on_progress(name, stage)`` with stage "embedded"
+    or "failed". Returns ``(stores, errors)`` where ``stores`` maps each file name
+    to its FAISS vector store and ``errors`` maps failed file names to the
+    exception raised.
+    """
+    def report(name, stage):
+        if on_progress is not None:
+            on_progress(name, stage)
+
+    stores = {}
+    errors = {}
+    if not files:
+        return stores, errors
+
+    with multiprocessing.get_context("spawn").Manager() as manager:
+        # One consumer per file, so a parser holding a pool slot always has
+        # someone draining its queue
+        with ThreadPoolExecutor(max_workers=len(files)) as embed_pool:
+            futures = {}
+            for name, file_bytes in files:
+                queue = manager.Queue(maxsize=QUEUE_DEPTH)
+                parse_future = parse_pool.submit(stream_pdf_chunks, name, file_bytes, queue, batch_size)
+                # Unblock the consumer if the worker itself dies
+                parse_future.add_done_callback(
+                    lambda f, q=queue: f.exception() is not None and q.put(f.exception())
+                )
+                futures[embed_pool.submit(_consume, queue, embeddings)] = name
+
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    stores[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+                    report(name, "failed")
+                    continue
+                report(name, "embedded")
+
+    return stores, errors
@@ -0,0 +1,80 @@
+"""Per-stage latency instrumentation for the RAG pipelines.
+
+``StageTimer`` times the stages of one request; ``LatencyTracker`` keeps a
+rolling window of recent requests for p50/p95 panels and appends every request
+to a local JSONL log for offline analysis.
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+DEFAULT_LOG_PATH = os.getenv("LATENCY_LOG_PATH", os.path.join(".cache", "latency.jsonl"))
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a non-empty sequence, ``q`` in [0, 100]"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+class StageTimer:
+    """Collect wall-clock milliseconds per named stage of a single request"""
+
+    def __init__(self):
+        self.timings = {}
+        self._start = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000)
+
+    def add(self, name, milliseconds):
+        self.timings[name] = self.timings.get(name, 0.0) + milliseconds
+
+    def total(self):
+        return (time.perf_counter() - self._start) * 1000
+
+
+class LatencyTracker:
+    """Rolling per-stage latency statistics plus a JSONL request log"""
+
+    def __init__(self, log_path=DEFAULT_LOG_PATH, window=500):
+        self.log_path = log_path
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+        if log_path:
+            directory = os.path.dirname(log_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def record(self, timings, **fields):
+        """Add one request's stage timings (milliseconds) and log it"""
+        with self._lock:
+            for stage, milliseconds in timings.items():
+                self._samples[stage].append(milliseconds)
+            if self.log_path:
+                entry = {"ts": time.time(), **fields,
+                         "timings_ms": {k: round(v, 2) for k, v in timings.items()}}
+                with open(self.log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def summary(self):
+        """Return {stage: {"count", "p50", "p95"}} over the rolling window"""
+        with self._lock:
+            return {
+                stage: {
+                    "count": len(samples),
+                    "p50": percentile(samples, 50),
+                    "p95": percentile(samples, 95),
+                }
+                for stage, samples in self._samples.items() if samples
+            }
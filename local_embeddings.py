@@ -0,0 +1,99 @@
+"""Offline, in-process embedding backends for the RAG apps.
+
+Selected with the ``EMBEDDING_BACKEND`` environment variable:
+
+- ``remote`` (default): the app's hosted embedding model (Vertex AI / Gemini)
+- ``hashing``: signed feature hashing of word and character n-grams, computed
+  in NumPy on the CPU; no model files, no network, microseconds per query
+- ``sentence-transformers``: a sentence-transformers model loaded from
+  ``LOCAL_EMBEDDING_MODEL`` (a local directory or cached model name)
+
+The local backends keep query latency off the network and let the apps run in
+air-gapped environments. ``benchmarks/bench_embedding_backends.py`` compares
+their query latency and retrieval quality with the remote model.
+"""
+import os
+import re
+import zlib
+
+import numpy as np
+from langchain.embeddings.base import Embeddings
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "remote")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+class HashingEmbeddings(Embeddings):
+    """Dense vectors from hashed word uni/bigrams and character n-grams"""
+
+    def __init__(self, dim=1024, char_ngrams=(3, 4, 5), word_weight=2.0):
+        self.dim = dim
+        self.char_ngrams = char_ngrams
+        self.word_weight = word_weight
+        self.model_name = f"hashing-ngrams-{dim}"
+
+    def _features(self, text):
+        words = _WORD_RE.findall(text.lower())
+        features = [(w, self.word_weight) for w in words]
+        features += [(f"{a} {b}", self.word_weight) for a, b in zip(words, words[1:])]
+        for word in words:
+            padded = f"<{word}>"
+            for n in self.char_ngrams:
+                features += [(padded[i:i + n], 1.0) for i in range(len(padded) - n + 1)]
+        return features
+
+    def _embed(self, texts):
+        rows, cols, values = [], [], []
+        for row, text in enumerate(texts):
+            for feature, weight in self._features(text):
+                # crc32 is stable across processes, unlike hash()
+                h = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                cols.append(h % self.dim)
+                values.append(weight if (h >> 31) & 1 else -weight)
+
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64)),
+                  np.asarray(values, dtype=np.float32))
+        # Sublinear term weighting, then unit length so L2 and cosine rank alike
+        matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts)).tolist()
+
+    def embed_query(self, text):
+        return self._embed([text])[0].tolist()
+
+    def embed_queries(self, texts):
+        # Queries and documents are embedded identically
+        return self.embed_documents(texts)
+
+
+def sentence_transformer_embeddings(model_name=LOCAL_EMBEDDING_MODEL, batch_size=64):
+    """Local sentence-transformers model on the CPU (needs ``sentence-transformers`` installed)"""
+    from langchain.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"batch_size": batch_size, "normalize_embeddings": True},
+    )
+
+
+def select_embeddings(remote_factory, backend=None):
+    """Return the configured embeddings; ``remote_factory`` builds the hosted model"""
+    backend = backend or EMBEDDING_BACKEND
+    if backend == "remote":
+        return remote_factory()
+    if backend == "hashing":
+        return HashingEmbeddings()
+    if backend == "sentence-transformers":
+        return sentence_transformer_embeddings()
+    raise ValueError(
+        f"Unknown EMBEDDING_BACKEND {backend!r}; expected remote, hashing or sentence-transformers"
+    )
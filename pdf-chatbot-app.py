@@ -1,15 +1,14 @@
 import streamlit as st
 import os
-import tempfile
+import time
 import google.generativeai as genai
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import VertexAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.document_loaders import PyPDFLoader
-from langchain.chains import ConversationalRetrievalChain
-from langchain.memory import ConversationBufferMemory
-from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
+from hybrid_retrieval import BM25Index
+from index_store import IndexStore
+from ingestion import create_parse_pool
+from pdf_chat import activate_documents, create_embeddings, ingest_documents, stream_turn
+from rag_client import RAG_API_URL, RAGClient
+from semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
@@ -31,57 +30,58 @@ if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
 if "processed_pdfs" not in st.session_state:
     st.session_state.processed_pdfs = []
+if "doc_ids" not in st.session_state:
+    st.session_state.doc_ids = []
+if "prompt_metrics" not in st.session_state:
+    st.session_state.prompt_metrics = []
+if "bm25_index" not in st.session_state:
+    st.session_state.bm25_index = BM25Index()
+if "index_bytes" not in st.session_state:
+    st.session_state.index_bytes = 0
+if "failed_uploads" not in st.session_state:
+    st.session_state.failed_uploads = set()
 
-# Function to process PDF and create vector store
-def process_pdf(uploaded_file):
-    # Save the uploaded file temporarily
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        tmp_file.write(uploaded_file.getvalue())
-        tmp_path = tmp_file.name
-    
-    # Load and split the PDF
-    loader = PyPDFLoader(tmp_path)
-    documents = loader.load()
-    
-    # Split documents into chunks
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=100
-    )
-    document_chunks = text_splitter.split_documents(documents)
-    
-    # Create embeddings and store in vector database
-    embeddings = VertexAIEmbeddings()
-    vectorstore = FAISS.from_documents(document_chunks, embeddings)
-    
-    # Clean up the temporary file
-    os.unlink(tmp_path)
-    
-    return vectorstore
-
-# Function to setup the conversational chain
-def setup_conversation_chain(vectorstore):
-    # Initialize LLM
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-pro",
-        temperature=0.2,
-        google_api_key=os.getenv("GOOGLE_API_KEY")
-    )
-    
-    # Create memory for conversation
-    memory = ConversationBufferMemory(
-        memory_key="chat_history",
-        return_messages=True
-    )
-    
-    # Create the conversation chain
-    conversation = ConversationalRetrievalChain.from_llm(
-        llm=llm,
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 5}),
-        memory=memory
-    )
-    
-    return conversation
+# Thin-client mode: with RAG_API_URL set, ingestion and answers go through the
+# RAG API (rag_api.py) and this script only renders the conversation
+@st.cache_resource
+def get_api_client():
+    return RAGClient(RAG_API_URL)
+
+if RAG_API_URL and "api_session" not in st.session_state:
+    st.session_state.api_session = get_api_client().create_session()
+
+# Messages kept for display; the model only ever sees the bounded memory
+MAX_DISPLAY_MESSAGES = 100
+
+# The index store is shared by every session, so listing it exposes other users'
+# uploads; only enable the "Saved Documents" picker on single-user deployments
+SHARE_SAVED_DOCUMENTS = os.getenv("SHARE_SAVED_DOCUMENTS", "0") == "1"
+
+# Shared embeddings client; repeated chunks are served from the on-disk cache and
+# misses go out as concurrent, rate-limited, retried batches (or to a local CPU
+# backend when EMBEDDING_BACKEND selects one)
+@st.cache_resource
+def get_embeddings():
+    return create_embeddings()
+
+# Per-document FAISS indexes persisted on disk and shared by every session
+@st.cache_resource
+def get_index_store():
+    return IndexStore()
+
+# Answers shared across sessions that ask about the same document set
+@st.cache_resource
+def get_answer_cache():
+    return SemanticCache()
+
+# Worker processes for PDF parsing, started once per server process
+@st.cache_resource
+def get_parse_pool():
+    return create_parse_pool()
+
+# Add stored documents to this session and rebuild the chain (see pdf_chat.py)
+def activate_stored_documents(documents):
+    activate_documents(st.session_state, documents, get_index_store(), get_embeddings())
 
 # Main app UI
 st.title("📚 Smart PDF Chatbot with RAG")
@@ -97,40 +97,111 @@ with st.sidebar:
         help="You can upload multiple PDF documents."
     )
     
+    # Files that failed to ingest are skipped on later reruns (i.e. every chat
+    # message) until they are removed from the uploader and uploaded again. They
+    # are keyed by name and size, which costs nothing per rerun, unlike hashing
+    upload_keys = {f.name: (f.name, f.size) for f in uploaded_files or []}
+    st.session_state.failed_uploads &= set(upload_keys.values())
+    
     if uploaded_files:
-        # Process each uploaded file if not already processed
-        for uploaded_file in uploaded_files:
-            if uploaded_file.name not in st.session_state.processed_pdfs:
-                with st.spinner(f"Processing {uploaded_file.name}..."):
-                    # Create or update vector store
-                    if not hasattr(st.session_state, 'vectorstore'):
-                        st.session_state.vectorstore = process_pdf(uploaded_file)
-                    else:
-                        new_vectorstore = process_pdf(uploaded_file)
-                        # Merge with existing vectorstore
-                        st.session_state.vectorstore.merge_from(new_vectorstore)
-                    
-                    # Add to processed PDFs list
-                    st.session_state.processed_pdfs.append(uploaded_file.name)
-                    
-                    # Setup or reset conversation chain
-                    st.session_state.conversation = setup_conversation_chain(st.session_state.vectorstore)
-                    
-                    st.success(f"Processed {uploaded_file.name}")
+        new_files = [
+            f for f in uploaded_files
+            if f.name not in st.session_state.processed_pdfs and upload_keys[f.name] not in st.session_state.failed_uploads
+        ]
+        if new_files and RAG_API_URL:
+            with st.spinner(f"Uploading {len(new_files)} document(s)..."):
+                report = get_api_client().upload_documents(
+                    st.session_state.api_session, [(f.name, f.getvalue()) for f in new_files]
+                )
+                for name, error in report["errors"].items():
+                    st.error(f"{name}: {error}")
+                    st.session_state.failed_uploads.add(upload_keys[name])
+                st.session_state.processed_pdfs = report["documents"]
+        elif new_files:
+            progress_bar = st.progress(0.0, text=f"Processing {len(new_files)} document(s)...")
+            file_status = {f.name: st.empty() for f in new_files}
+            for name, status in file_status.items():
+                status.write(f"⏳ {name}")
+            completed = []
+            
+            def on_progress(name, stage):
+                completed.append(name)
+                progress_bar.progress(len(completed) / len(new_files), text=f"Processed {len(completed)}/{len(new_files)}")
+                if stage == "embedded":
+                    file_status[name].success(f"Processed {name}")
+                else:
+                    file_status[name].error(f"Failed to process {name}")
+            
+            # Only documents that are not already on disk are parsed and embedded
+            start = time.perf_counter()
+            documents, errors, total_chunks = ingest_documents(
+                [(f.name, f.getvalue()) for f in new_files],
+                get_index_store(), get_embeddings(), get_parse_pool(), on_progress=on_progress,
+            )
+            elapsed = time.perf_counter() - start
+            progress_bar.progress(1.0, text=f"Processed {len(new_files)}/{len(new_files)}")
+            for name, status in file_status.items():
+                if name not in completed:
+                    status.success(f"Loaded {name} from saved index")
+            if total_chunks:
+                st.caption(f"Ingested {total_chunks} chunks at {total_chunks / elapsed:.1f} chunks/s")
+            for name, error in errors.items():
+                st.error(f"{name}: {error}")
+                st.session_state.failed_uploads.add(upload_keys[name])
+            
+            # Add everything that made it to disk to the session in one pass,
+            # then rebuild the conversation chain once
+            activate_stored_documents(documents)
+        
+        if st.session_state.failed_uploads:
+            failed_names = ", ".join(sorted(name for name, _ in st.session_state.failed_uploads))
+            st.caption(f"Not processed: {failed_names}. Remove and upload again to retry.")
+    
+    # Documents processed in earlier sessions can be loaded straight from disk
+    saved_documents = {} if RAG_API_URL or not SHARE_SAVED_DOCUMENTS else {
+        doc_id: meta for doc_id, meta in get_index_store().list_documents().items()
+        if doc_id not in st.session_state.doc_ids
+    }
+    if saved_documents:
+        st.header("Saved Documents")
+        selected = st.multiselect(
+            "Load previously processed documents",
+            options=list(saved_documents),
+            format_func=lambda doc_id: saved_documents[doc_id]["name"],
+        )
+        if selected and st.button("Load Selected"):
+            with st.spinner("Loading saved indexes..."):
+                activate_stored_documents([(doc_id, saved_documents[doc_id]["name"]) for doc_id in selected])
+            st.rerun()
     
     st.header("Processed Documents")
     if st.session_state.processed_pdfs:
         for pdf in st.session_state.processed_pdfs:
             st.write(f"- {pdf}")
+        if not RAG_API_URL:
+            index = st.session_state.vectorstore.index
+            st.caption(f"{index.ntotal:,} chunks · {type(index).__name__} · {st.session_state.index_bytes / 2**20:.1f} MB")
     else:
         st.write("No documents processed yet.")
         
     st.header("Settings")
     st.caption("Gemini API Key is loaded from .env file")
+    conversation_mode = st.radio(
+        "Conversation mode",
+        ["Standard", "Fast"],
+        help="Standard rewrites follow-ups with an extra LLM call before retrieval. "
+             "Fast skips that call and answers with a single LLM call.",
+    )
+    stream_responses = st.toggle("Stream responses", value=True, help="Show the answer token by token as Gemini generates it.")
     
     # Clear chat button
     if st.button("Clear Chat History"):
         st.session_state.chat_history = []
+        st.session_state.prompt_metrics = []
+        if RAG_API_URL:
+            get_api_client().clear_chat(st.session_state.api_session)
+        elif st.session_state.conversation is not None:
+            st.session_state.conversation.memory.clear()
 
 # Main chat area
 st.divider()
@@ -154,18 +225,38 @@ if query := st.chat_input("Ask a question about your documents..."):
         st.write(query)
     
     # Check if we can process the query
-    if st.session_state.conversation is not None:
-        with st.spinner("Thinking..."):
-            # Get response from conversation chain
-            response = st.session_state.conversation({"question": query})
-            ai_response = response["answer"]
-            
-            # Add AI response to chat history
-            st.session_state.chat_history.append(ai_response)
+    ready = bool(st.session_state.processed_pdfs) if RAG_API_URL else st.session_state.conversation is not None
+    if ready:
+        start = time.perf_counter()
+        turn_metrics = {}
+        if RAG_API_URL:
+            tokens = get_api_client().stream_chat(st.session_state.api_session, query, conversation_mode)
+        else:
+            # Semantic cache lookup, retrieval and memory update (see pdf_chat.py)
+            tokens = stream_turn(
+                st.session_state, query, conversation_mode, get_embeddings(), get_answer_cache(), turn_metrics
+            )
+        if stream_responses:
+            # Render tokens as they arrive; write_stream returns the full text
+            with st.chat_message("assistant", avatar="🤖"):
+                ai_response = st.write_stream(tokens)
+        else:
+            with st.spinner("Thinking..."):
+                ai_response = "".join(tokens)
             
             # Display AI response
             with st.chat_message("assistant", avatar="🤖"):
                 st.write(ai_response)
+        if turn_metrics.get("cached"):
+            st.caption(f"⚡ Answered from cache in {time.perf_counter() - start:.2f}s")
+        else:
+            st.caption(f"Answered in {time.perf_counter() - start:.2f}s ({conversation_mode.lower()} mode)")
+        if "prompt_tokens" in turn_metrics:
+            st.session_state.prompt_metrics.append(turn_metrics)
+        
+        # Add AI response to chat history
+        st.session_state.chat_history.append(ai_response)
+        del st.session_state.chat_history[:-MAX_DISPLAY_MESSAGES]
     else:
         # Display error message if no documents are uploaded
         with st.chat_message("assistant", avatar="🤖"):
@@ -173,6 +264,29 @@ if query := st.chat_input("Ask a question about your documents..."):
             st.error(error_message)
             st.session_state.chat_history.append(error_message)
 
+# Answer cache statistics (rendered last so they include this turn)
+with st.sidebar:
+    if not RAG_API_URL:
+        st.header("Answer Cache")
+        cache_stats = get_answer_cache().stats()
+        col1, col2 = st.columns(2)
+        col1.metric("Hit rate", f"{cache_stats['hit_rate']:.0%}", help=f"{cache_stats['hits']} hits / {cache_stats['misses']} misses")
+        col2.metric("Latency saved", f"{cache_stats['seconds_saved']:.1f}s")
+        st.caption(f"{cache_stats['entries']} cached answers")
+    
+    # Prompt size per answered turn; should stay flat as the conversation grows
+    if st.session_state.prompt_metrics:
+        st.header("Prompt Size")
+        last_turn = st.session_state.prompt_metrics[-1]
+        st.caption(
+            f"Last turn: ~{last_turn['prompt_tokens']} prompt tokens "
+            f"({last_turn['history_tokens']} from history, {last_turn['context_docs']} context chunks)"
+        )
+        st.line_chart(
+            [{"prompt tokens": m["prompt_tokens"], "history tokens": m["history_tokens"]}
+             for m in st.session_state.prompt_metrics]
+        )
+
 # Add some information at the bottom
 st.divider()
 st.caption("This app uses Google's Gemini API and LangChain for Retrieval-Augmented Generation (RAG).")
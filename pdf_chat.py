@@ -0,0 +1,149 @@
+"""Session state and turn logic for the PDF chatbot.
+
+Shared by the Streamlit app (``pdf-chatbot-app.py``), which keeps the state in
+``st.session_state``, and the HTTP API (``rag_api.py``), which keeps it in a
+``ChatSession`` per client. Both expose the same attributes: ``conversation``,
+``processed_pdfs``, ``doc_ids``, ``bm25_index``, ``vectorstore`` and
+``index_bytes``.
+"""
+import os
+import time
+
+from langchain.chains import ConversationalRetrievalChain
+from langchain.embeddings import VertexAIEmbeddings
+from langchain_google_genai import ChatGoogleGenerativeAI
+
+from async_embeddings import AsyncBatchEmbeddings
+from bounded_memory import RollingSummaryMemory
+from context_selection import CONTEXT_TOKEN_BUDGET, MMR_LAMBDA
+from embedding_cache import CachedEmbeddings
+from hybrid_retrieval import BM25Index, HybridRetriever
+from index_backends import compress_store, index_memory_bytes
+from index_store import document_id
+from ingestion import ingest_files
+from local_embeddings import select_embeddings
+from semantic_cache import corpus_version
+from streaming import condense_question, fast_questions, stream_conversation
+
+
+def create_embeddings():
+    """Embeddings client: on-disk cache in front of concurrent, rate-limited remote batches
+    (or a local CPU backend when EMBEDDING_BACKEND selects one)"""
+    return CachedEmbeddings(select_embeddings(lambda: AsyncBatchEmbeddings(VertexAIEmbeddings())))
+
+
+def setup_conversation_chain(vectorstore, bm25_index=None):
+    # Initialize LLM
+    llm = ChatGoogleGenerativeAI(
+        model="gemini-pro",
+        temperature=0.2,
+        google_api_key=os.getenv("GOOGLE_API_KEY")
+    )
+
+    # Create memory for conversation: recent turns verbatim, older ones summarized
+    memory = RollingSummaryMemory(
+        llm=llm,
+        memory_key="chat_history",
+        return_messages=True,
+        max_turns=4,
+        max_token_limit=1500
+    )
+
+    # Fuse vector similarity with BM25 keyword matches when a keyword index is available
+    if bm25_index is not None:
+        # Up to 8 chunks, chosen by MMR until the context token budget is spent
+        retriever = HybridRetriever(
+            vectorstore=vectorstore, bm25=bm25_index, k=8,
+            mmr_lambda=MMR_LAMBDA, token_budget=CONTEXT_TOKEN_BUDGET,
+        )
+    else:
+        retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
+
+    # Create the conversation chain
+    return ConversationalRetrievalChain.from_llm(
+        llm=llm,
+        retriever=retriever,
+        memory=memory
+    )
+
+
+class ChatSession:
+    """Chat state of one API client, mirroring the Streamlit session state"""
+
+    def __init__(self):
+        self.conversation = None
+        self.processed_pdfs = []
+        self.doc_ids = []
+        self.bm25_index = BM25Index()
+        self.vectorstore = None
+        self.index_bytes = 0
+
+
+def ingest_documents(files, index_store, embeddings, parse_pool, on_progress=None):
+    """Parse and embed the ``(name, bytes)`` files not already stored; returns (documents, errors, chunks).
+
+    ``documents`` lists ``(doc_id, name)`` for every file now available in the
+    index store, ready for ``activate_documents``.
+    """
+    doc_ids = {name: document_id(data, embeddings.model_name) for name, data in files}
+    # Only parse and embed documents that are not already on disk
+    to_ingest = [(name, data) for name, data in files if not index_store.has(doc_ids[name])]
+    stores, errors = ingest_files(to_ingest, embeddings, parse_pool, on_progress=on_progress) if to_ingest else ({}, {})
+    for name, store in stores.items():
+        index_store.save(doc_ids[name], store, name)
+    chunks = sum(store.index.ntotal for store in stores.values())
+    documents = [(doc_ids[name], name) for name, _ in files if index_store.has(doc_ids[name])]
+    return documents, errors, chunks
+
+
+def activate_documents(state, documents, index_store, embeddings):
+    """Add stored documents to a session and rebuild its conversation chain once"""
+    if not documents:
+        return
+    for doc_id, name in documents:
+        if doc_id in state.doc_ids:
+            continue
+        state.doc_ids.append(doc_id)
+        state.processed_pdfs.append(name)
+        # Keyword index grows incrementally with each new document's chunks
+        state.bm25_index.add_vectorstore(index_store.load(doc_id, embeddings))
+    # Documents are searched in place through their shared memory-mapped indexes;
+    # only collections past the compression threshold get a private compressed
+    # copy (see index_backends.py)
+    state.vectorstore = compress_store(index_store.load_combined(state.doc_ids, embeddings))
+    # Measured once here: serializing the index on every rerun to size it is not free
+    state.index_bytes = index_memory_bytes(state.vectorstore.index)
+    state.conversation = setup_conversation_chain(state.vectorstore, state.bm25_index)
+
+
+def stream_turn(state, query, mode, embeddings, answer_cache, metrics):
+    """Yield the answer tokens for one chat turn and update the session's memory.
+
+    ``mode`` is "Standard" (condense follow-ups with an extra LLM call) or
+    "Fast" (single LLM call). Answers for the same document set are looked up
+    in and stored to ``answer_cache``; ``metrics`` receives ``cached`` and, for
+    generated answers, the prompt size of the turn.
+    """
+    conversation = state.conversation
+    if mode == "Fast":
+        retrieval_question, answer_question = fast_questions(conversation, query)
+    else:
+        retrieval_question = answer_question = condense_question(conversation, query)
+
+    # Look the question up in the semantic cache for this document set
+    question_vector = embeddings.embed_query(retrieval_question)
+    version = corpus_version(state.doc_ids)
+    answer = answer_cache.lookup(question_vector, version)
+    metrics["cached"] = answer is not None
+    if answer is not None:
+        conversation.memory.save_context({"question": query}, {"answer": answer})
+        yield answer
+        return
+
+    start = time.perf_counter()
+    metrics.update(conversation.memory.prompt_metrics())
+    tokens = []
+    for token in stream_conversation(conversation, query, retrieval_question, answer_question, metrics=metrics):
+        tokens.append(token)
+        yield token
+    answer_cache.store(question_vector, retrieval_question, "".join(tokens), version, time.perf_counter() - start)
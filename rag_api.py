@@ -0,0 +1,195 @@
+"""Async HTTP API for the RAG chains, independent of Streamlit reruns.
+
+Serves the Document Assistant chain (``rag_pipeline.build_qa_chain``) and the
+PDF chatbot sessions (``pdf_chat``) from one process. The assistant streams
+the LLM natively on the event loop, so one worker keeps many answers in flight;
+chat turns and ingestion run on the worker thread pool, serialized per session.
+
+Needs ``fastapi`` and ``uvicorn`` (``pip install fastapi uvicorn``). Run from
+the repository root:
+
+    uvicorn rag_api:app --host 0.0.0.0 --port 8000
+
+Endpoints:
+
+    POST /assistant/query                   {"question"} -> {"answer", "timings"}
+    POST /assistant/query/stream            {"question"} -> text/plain token stream
+    POST /chat/sessions                     -> {"session_id"}
+    POST /chat/sessions/{id}/documents      {"files": [{"name", "data" (base64 PDF)}]} -> ingest report
+    POST /chat/sessions/{id}/query          {"question", "mode"} -> {"answer", "metrics"}
+    POST /chat/sessions/{id}/query/stream   {"question", "mode"} -> text/plain token stream
+    POST /chat/sessions/{id}/clear          forget the conversation history
+
+``benchmarks/bench_api.py`` load-tests the assistant endpoints against a
+stubbed LLM.
+"""
+import asyncio
+import base64
+import binascii
+import os
+import sys
+import uuid
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import List
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(ROOT, "Day_17_RAG_Document_Assitant"))
+from index_store import IndexStore
+from ingestion import create_parse_pool
+from latency_metrics import LatencyTracker, StageTimer
+from pdf_chat import ChatSession, activate_documents, create_embeddings, ingest_documents, stream_turn
+from rag_pipeline import astream_answer_with_timings, build_qa_chain
+from semantic_cache import SemanticCache
+
+MAX_SESSIONS = int(os.getenv("API_MAX_SESSIONS", "1000"))
+MAX_CONCURRENT_ANSWERS = int(os.getenv("API_MAX_CONCURRENT_ANSWERS", "256"))
+
+
+class QueryRequest(BaseModel):
+    question: str
+
+
+class ChatRequest(BaseModel):
+    question: str
+    mode: str = "Standard"
+
+
+class UploadedFile(BaseModel):
+    name: str
+    data: str  # base64-encoded PDF
+
+
+class UploadRequest(BaseModel):
+    files: List[UploadedFile]
+
+
+class _Session:
+    def __init__(self):
+        self.state = ChatSession()
+        self.lock = asyncio.Lock()
+
+
+def create_app(qa_chain_factory=build_qa_chain, embeddings_factory=create_embeddings):
+    """FastAPI app; the factories are called once at start-up"""
+
+    @asynccontextmanager
+    async def lifespan(app):
+        app.state.qa_chain = await run_in_threadpool(qa_chain_factory)
+        app.state.embeddings = embeddings_factory()
+        app.state.index_store = IndexStore()
+        app.state.answer_cache = SemanticCache()
+        app.state.latency = LatencyTracker()
+        app.state.answer_slots = asyncio.Semaphore(MAX_CONCURRENT_ANSWERS)
+        app.state.sessions = OrderedDict()
+        app.state.parse_pool = None
+        yield
+        if app.state.parse_pool is not None:
+            app.state.parse_pool.shutdown()
+
+    app = FastAPI(title="RAG API", lifespan=lifespan)
+
+    async def assistant_tokens(question, timer=None):
+        timer = timer if timer is not None else StageTimer()
+        async with app.state.answer_slots:
+            async for token in astream_answer_with_timings(question, app.state.qa_chain, timer):
+                yield token
+        app.state.latency.record({**timer.timings, "total": timer.total()}, query=question, source="api")
+
+    def get_session(session_id):
+        session = app.state.sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        app.state.sessions.move_to_end(session_id)
+        return session
+
+    async def chat_tokens(session, request, metrics):
+        if session.state.conversation is None:
+            raise HTTPException(status_code=409, detail="Upload at least one PDF document first")
+        tokens = stream_turn(session.state, request.question, request.mode,
+                             app.state.embeddings, app.state.answer_cache, metrics)
+        async with session.lock:
+            async for token in iterate_in_threadpool(tokens):
+                yield token
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "sessions": len(app.state.sessions)}
+
+    @app.post("/assistant/query")
+    async def assistant_query(request: QueryRequest):
+        timer = StageTimer()
+        tokens = [token async for token in assistant_tokens(request.question, timer)]
+        return {"answer": "".join(tokens), "timings": timer.timings}
+
+    @app.post("/assistant/query/stream")
+    async def assistant_query_stream(request: QueryRequest):
+        return StreamingResponse(assistant_tokens(request.question), media_type="text/plain; charset=utf-8")
+
+    @app.get("/assistant/latency")
+    async def assistant_latency():
+        return app.state.latency.summary()
+
+    @app.post("/chat/sessions")
+    async def create_session():
+        session_id = uuid.uuid4().hex
+        app.state.sessions[session_id] = _Session()
+        while len(app.state.sessions) > MAX_SESSIONS:
+            app.state.sessions.popitem(last=False)
+        return {"session_id": session_id}
+
+    @app.post("/chat/sessions/{session_id}/documents")
+    async def upload_documents(session_id: str, request: UploadRequest):
+        session = get_session(session_id)
+        try:
+            files = [(file.name, base64.b64decode(file.data, validate=True)) for file in request.files]
+        except binascii.Error as e:
+            raise HTTPException(status_code=400, detail=f"File data is not valid base64: {e}") from e
+        if app.state.parse_pool is None:
+            # Worker processes are only started once something is ingested
+            app.state.parse_pool = create_parse_pool()
+        # All files of one upload are ingested together, so the session's
+        # index and chain are rebuilt once rather than once per file
+        documents, errors, chunks = await run_in_threadpool(
+            ingest_documents, files, app.state.index_store, app.state.embeddings, app.state.parse_pool
+        )
+        async with session.lock:
+            await run_in_threadpool(
+                activate_documents, session.state, documents, app.state.index_store, app.state.embeddings
+            )
+        return {
+            "documents": session.state.processed_pdfs,
+            "errors": {file: str(error) for file, error in errors.items()},
+            "chunks": chunks,
+        }
+
+    @app.post("/chat/sessions/{session_id}/query")
+    async def chat_query(session_id: str, request: ChatRequest):
+        metrics = {}
+        tokens = [token async for token in chat_tokens(get_session(session_id), request, metrics)]
+        return {"answer": "".join(tokens), "metrics": metrics}
+
+    @app.post("/chat/sessions/{session_id}/query/stream")
+    async def chat_query_stream(session_id: str, request: ChatRequest):
+        session = get_session(session_id)
+        if session.state.conversation is None:
+            raise HTTPException(status_code=409, detail="Upload at least one PDF document first")
+        return StreamingResponse(chat_tokens(session, request, {}), media_type="text/plain; charset=utf-8")
+
+    @app.post("/chat/sessions/{session_id}/clear")
+    async def clear_chat(session_id: str):
+        session = get_session(session_id)
+        if session.state.conversation is not None:
+            async with session.lock:
+                session.state.conversation.memory.clear()
+        return {"cleared": True}
+
+    return app
+
+
+app = create_app()
@@ -0,0 +1,67 @@
+"""Minimal HTTP client for ``rag_api.py``, used by the Streamlit apps in client mode.
+
+The apps talk to the API instead of running the chains in-process when
+``RAG_API_URL`` is set (e.g. ``RAG_API_URL=http://localhost:8000``).
+"""
+import base64
+import codecs
+import json
+import os
+import urllib.request
+
+RAG_API_URL = os.getenv("RAG_API_URL", "")
+
+
+class RAGClient:
+    """Blocking client for the RAG API; streaming calls yield text as it arrives"""
+
+    def __init__(self, base_url=RAG_API_URL, timeout=120):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        request = urllib.request.Request(
+            self.base_url + path, data=data, headers={"Content-Type": "application/json"}, method="POST",
+        )
+        return urllib.request.urlopen(request, timeout=self.timeout)
+
+    def _post_json(self, path, payload=None):
+        with self._request(path, payload) as response:
+            return json.loads(response.read())
+
+    def _stream(self, path, payload):
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with self._request(path, payload) as response:
+            while chunk := response.read1(4096):
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    # Document Assistant
+    def ask(self, question):
+        return self._post_json("/assistant/query", {"question": question})
+
+    def stream_answer(self, question):
+        yield from self._stream("/assistant/query/stream", {"question": question})
+
+    # PDF chatbot
+    def create_session(self):
+        return self._post_json("/chat/sessions")["session_id"]
+
+    def upload_documents(self, session_id, files):
+        """Ingest ``(name, bytes)`` PDFs in one request, so the session's index is rebuilt once"""
+        payload = {"files": [{"name": name, "data": base64.b64encode(data).decode("ascii")} for name, data in files]}
+        return self._post_json(f"/chat/sessions/{session_id}/documents", payload)
+
+    def chat(self, session_id, question, mode="Standard"):
+        return self._post_json(f"/chat/sessions/{session_id}/query", {"question": question, "mode": mode})
+
+    def stream_chat(self, session_id, question, mode="Standard"):
+        yield from self._stream(f"/chat/sessions/{session_id}/query/stream", {"question": question, "mode": mode})
+
+    def clear_chat(self, session_id):
+        return self._post_json(f"/chat/sessions/{session_id}/clear")
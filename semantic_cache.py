@@ -0,0 +1,94 @@
+"""Semantic answer cache for RAG chat.
+
+Answers are stored against the embedding of the standalone question and the
+version of the document set they were generated from. A later question about
+the same document set whose embedding is close enough (cosine similarity above
+``threshold``) gets the stored answer without retrieval or an LLM call. Entries
+expire after ``ttl_seconds`` and the least recently used ones are evicted once
+``max_entries`` is reached.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def corpus_version(doc_ids):
+    """Version tag for a set of documents; changes whenever the set changes"""
+    return hashlib.sha256("\n".join(sorted(doc_ids)).encode("utf-8")).hexdigest()[:16]
+
+
+class SemanticCache:
+    """Process-wide LRU/TTL cache of answers keyed by question embeddings"""
+
+    def __init__(self, threshold=0.95, max_entries=1000, ttl_seconds=24 * 3600):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.seconds_saved = 0.0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        expired = [key for key, entry in self._entries.items()
+                   if now - entry["created"] > self.ttl_seconds]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, vector, version):
+        """Return the cached answer for the closest question, or None"""
+        query = self._normalize(vector)
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            candidates = [(key, entry) for key, entry in self._entries.items()
+                          if entry["version"] == version]
+            if candidates:
+                matrix = np.stack([entry["vector"] for _, entry in candidates])
+                scores = matrix @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    key, entry = candidates[best]
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    self.seconds_saved += entry["seconds"]
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def store(self, vector, question, answer, version, seconds):
+        """Cache an answer that took ``seconds`` to produce"""
+        with self._lock:
+            self._entries[self._next_id] = {
+                "vector": self._normalize(vector),
+                "question": question,
+                "answer": answer,
+                "version": version,
+                "seconds": seconds,
+                "created": time.time(),
+            }
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "seconds_saved": self.seconds_saved,
+            }
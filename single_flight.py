@@ -0,0 +1,152 @@
+"""Process-wide request coalescing for streamed answers.
+
+When many sessions ask the same question at once (a demo audience clicking the
+same sample question), only the first caller runs the pipeline. Concurrent
+callers with the same key attach to that in-flight call and replay its tokens
+as they are produced, and finished answers are kept for ``ttl_seconds`` so a
+burst arriving just after the first answer completes is served from memory.
+
+If the leading caller stops reading (its Streamlit run was interrupted) while
+others are still waiting, the half-consumed stream is handed to one of them,
+which keeps driving it for the rest.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_query(query):
+    """Coalescing key: case- and whitespace-insensitive"""
+    return " ".join(query.lower().split())
+
+
+class _Flight:
+    def __init__(self):
+        self.tokens = []
+        self.done = False
+        self.error = None
+        self.followers = 0
+        # Paused token iterator left behind by a leader that stopped reading
+        self.orphan = None
+        self.condition = threading.Condition()
+
+
+class SingleFlight:
+    """Share one in-flight token stream per key, plus a short-TTL result cache"""
+
+    def __init__(self, ttl_seconds=60, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._flights = {}
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+        self.cache_hits = 0
+
+    def _cached(self, key, now):
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        answer, created = entry
+        if now - created > self.ttl_seconds:
+            del self._results[key]
+            return None
+        self._results.move_to_end(key)
+        return answer
+
+    def stream(self, key, produce):
+        """Yield the answer tokens for ``key``; ``produce()`` is only called by the leader"""
+        iterator = None
+        with self._lock:
+            answer = self._cached(key, time.time())
+            if answer is not None:
+                self.cache_hits += 1
+            else:
+                flight = self._flights.get(key)
+                if flight is None:
+                    flight = self._flights[key] = _Flight()
+                    self.calls += 1
+                    iterator = produce()
+                else:
+                    flight.followers += 1
+                    self.coalesced += 1
+        if answer is not None:
+            yield answer
+            return
+        if iterator is not None:
+            yield from self._drive(key, flight, iterator)
+            return
+
+        # Replay the leader's tokens as they arrive
+        index = 0
+        claimed = False
+        try:
+            while True:
+                with flight.condition:
+                    while len(flight.tokens) <= index and not flight.done and flight.orphan is None:
+                        flight.condition.wait()
+                    new_tokens = flight.tokens[index:]
+                    done, error = flight.done, flight.error
+                    if not done and flight.orphan is not None:
+                        iterator, flight.orphan = flight.orphan, None
+                        flight.followers -= 1
+                        claimed = True
+                index += len(new_tokens)
+                if new_tokens:
+                    yield "".join(new_tokens)
+                if claimed:
+                    yield from self._drive(key, flight, iterator)
+                    return
+                if done:
+                    if error is not None:
+                        raise error
+                    return
+        finally:
+            if not claimed:
+                with flight.condition:
+                    flight.followers -= 1
+
+    def _drive(self, key, flight, iterator):
+        """Pull tokens from ``iterator``, publishing each one to the followers"""
+        completed = False
+        handed_off = False
+        try:
+            for token in iterator:
+                with flight.condition:
+                    flight.tokens.append(token)
+                    flight.condition.notify_all()
+                yield token
+            completed = True
+        except GeneratorExit:
+            with self._lock, flight.condition:
+                if flight.followers:
+                    flight.orphan = iterator
+                    handed_off = True
+                    flight.condition.notify_all()
+            if not handed_off:
+                iterator.close()
+            raise
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            if not handed_off:
+                self._finish(key, flight, completed)
+
+    def _finish(self, key, flight, completed):
+        with self._lock:
+            self._flights.pop(key, None)
+            if completed:
+                self._results[key] = ("".join(flight.tokens), time.time())
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            with flight.condition:
+                if not completed and flight.error is None:
+                    flight.error = RuntimeError("answer stream was abandoned")
+                flight.done = True
+                flight.condition.notify_all()
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "cache_hits": self.cache_hits}
@@ -0,0 +1,114 @@
+"""Token streaming for the LangChain QA chains used by the RAG apps.
+
+The legacy ``RetrievalQA`` / ``ConversationalRetrievalChain`` calls only return
+once the whole answer is generated. These helpers run the same steps (condense,
+retrieve, stuff the prompt) and then stream the final LLM call, so the UI can
+render tokens as the model produces them.
+"""
+import re
+
+from langchain.chains.conversational_retrieval.base import _get_chat_history
+
+from token_budget import estimate_tokens
+
+# Words that usually point back into the conversation ("what about its cost?")
+REFERENCE_WORDS = {
+    "it", "its", "this", "that", "these", "those", "they", "them", "their",
+    "he", "she", "him", "her", "his", "above", "previous", "earlier", "former",
+    "latter", "same", "also", "else", "more", "again",
+}
+SELF_CONTAINED_MIN_WORDS = 5
+
+
+def build_stuff_prompt(combine_docs_chain, docs, **inputs):
+    """Format the prompt a "stuff" documents chain would send for ``docs``"""
+    prompt_inputs = combine_docs_chain._get_inputs(docs, **inputs)
+    return combine_docs_chain.llm_chain.prompt.format_prompt(**prompt_inputs)
+
+
+def stream_prompt(llm, prompt):
+    """Yield the text of each chunk the LLM streams back for a prompt value"""
+    for chunk in llm.stream(prompt.to_messages()):
+        token = getattr(chunk, "content", chunk)
+        if token:
+            yield token
+
+
+async def astream_prompt(llm, prompt):
+    """Async ``stream_prompt`` using the LLM's native async streaming"""
+    async for chunk in llm.astream(prompt.to_messages()):
+        token = getattr(chunk, "content", chunk)
+        if token:
+            yield token
+
+
+def stream_stuff_answer(combine_docs_chain, docs, metrics=None, **inputs):
+    """Yield answer tokens from a "stuff" documents chain over ``docs``"""
+    prompt = build_stuff_prompt(combine_docs_chain, docs, **inputs)
+    if metrics is not None:
+        metrics["context_docs"] = len(docs)
+        metrics["prompt_tokens"] = estimate_tokens(prompt.to_string())
+    yield from stream_prompt(combine_docs_chain.llm_chain.llm, prompt)
+
+
+def stream_retrieval_qa(qa_chain, query):
+    """Yield answer tokens for a RetrievalQA chain"""
+    docs = qa_chain.retriever.get_relevant_documents(query)
+    yield from stream_stuff_answer(qa_chain.combine_documents_chain, docs, question=query)
+
+
+def condense_question(chain, question):
+    """Rewrite a follow-up into a standalone question using the chain's memory"""
+    chat_history = chain.memory.load_memory_variables({})[chain.memory.memory_key]
+    if not chat_history:
+        return question
+    get_chat_history = chain.get_chat_history or _get_chat_history
+    return chain.question_generator.run(
+        question=question, chat_history=get_chat_history(chat_history)
+    )
+
+
+def is_self_contained(question):
+    """Heuristic: long enough and free of words that refer back to earlier turns"""
+    words = re.findall(r"[a-z']+", question.lower())
+    return len(words) >= SELF_CONTAINED_MIN_WORDS and not REFERENCE_WORDS.intersection(words)
+
+
+def fast_questions(chain, question, max_turns=3):
+    """Retrieval and answer questions for single-LLM-call mode.
+
+    Skips the condensation call entirely. A follow-up that needs context is
+    retrieved together with the previous user question, and the recent turns are
+    handed to the answering call so the model resolves the reference itself.
+    """
+    chat_history = chain.memory.load_memory_variables({})[chain.memory.memory_key]
+    if not chat_history or is_self_contained(question):
+        return question, question
+
+    previous_question = next(
+        (message.content for message in reversed(chat_history) if message.type == "human"), ""
+    )
+    get_chat_history = chain.get_chat_history or _get_chat_history
+    recent_turns = get_chat_history(chat_history[-2 * max_turns:])
+    answer_question = f"Conversation so far:{recent_turns}\n\nFollow-up question: {question}"
+    return f"{previous_question} {question}".strip(), answer_question
+
+
+def stream_conversation(chain, question, retrieval_question=None, answer_question=None, metrics=None):
+    """Yield answer tokens for a ConversationalRetrievalChain and update its memory.
+
+    If ``metrics`` is a dict it receives the answer prompt's estimated size.
+    """
+    if retrieval_question is None:
+        retrieval_question = condense_question(chain, question)
+    if answer_question is None:
+        answer_question = retrieval_question
+
+    docs = chain.retriever.get_relevant_documents(retrieval_question)
+    tokens = []
+    for token in stream_stuff_answer(chain.combine_docs_chain, docs, metrics, question=answer_question):
+        tokens.append(token)
+        yield token
+
+    # Record the turn exactly as the blocking chain call would
+    chain.memory.save_context({"question": question}, {"answer": "".join(tokens)})
@@ -0,0 +1,28 @@
+"""Cheap prompt-size estimates for budgeting LLM inputs.
+
+Calling the provider's token counter is a network round-trip for Gemini, far
+too slow for per-turn bookkeeping, so budgets use the usual ~4 characters per
+token rule of thumb instead.
+"""
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text):
+    """Approximate token count of a string"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def estimate_message_tokens(messages):
+    """Approximate token count of a list of chat messages"""
+    return sum(estimate_tokens(message.content) for message in messages)
+
+
+def count_within_budget(texts, budget, min_count=1):
+    """How many of ``texts``, taken in order, fit in ``budget`` tokens (never fewer than ``min_count``)"""
+    used = 0
+    for count, text in enumerate(texts):
+        used += estimate_tokens(text)
+        if used > budget:
+            return max(count, min(min_count, len(texts)))
+    return len(texts)